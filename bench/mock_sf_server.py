@@ -0,0 +1,707 @@
+import re
+import csv
+import io
+import json
+import time
+import uuid
+import base64
+import random
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+API_VERSION = "64.0"
+# --fail-rate: writes a client may replay get a 503; POSTs, which it never replays after a 5xx, are
+# rejected up front (429) or, on the collections and graph endpoints, fail on a row lock
+REPLAYABLE_METHODS = ("PUT", "PATCH", "DELETE")
+ROW_LOCK_ENDPOINTS = ("/composite/sobjects", "/composite/graph")
+
+ID_PREFIXES = {
+    "Product2": "01t",
+    "ProductClassification": "11B",
+    "ProductRelatedComponent": "0dS",
+    "ProductRelationshipType": "0yo",
+    "ContextDefinition": "11O",
+    "ExpressionSet": "9QL",
+    "ExpressionSetDefinition": "9QA",
+    "ExpressionSetDefinitionVersion": "9QB",
+    "ExpressionSetDefinitionContextDefinition": "9QC",
+    "ExpressionSetConstraintObj": "9QD",
+}
+
+# relationship name -> (target object, lookup field) per object
+RELATIONSHIPS = {
+    "ProductRelatedComponent": {
+        "ParentProduct": ("Product2", "ParentProductId"),
+        "ChildProduct": ("Product2", "ChildProductId"),
+        "ChildProductClassification": ("ProductClassification", "ChildProductClassificationId"),
+        "ProductRelationshipType": ("ProductRelationshipType", "ProductRelationshipTypeId"),
+    },
+    "ExpressionSetDefinitionVersion": {
+        "ExpressionSetDefinition": ("ExpressionSetDefinition", "ExpressionSetDefinitionId"),
+    },
+    "ExpressionSetDefinitionContextDefinition": {
+        "ExpressionSetDefinition": ("ExpressionSetDefinition", "ExpressionSetDefinitionId"),
+    },
+    "ExpressionSet": {
+        "ExpressionSetDefinition": ("ExpressionSetDefinition", "ExpressionSetDefinitionId"),
+    },
+    "ExpressionSetConstraintObj": {
+        "ExpressionSet": ("ExpressionSet", "ExpressionSetId"),
+    },
+}
+
+
+def now_stamp():
+    return time.strftime("%Y-%m-%dT%H:%M:%S.000+0000", time.gmtime())
+
+
+# === In-memory org ===
+class MockOrg:
+    def __init__(self, tag):
+        self.tag = tag
+        self.lock = threading.RLock()
+        self.tables = {obj: {} for obj in ID_PREFIXES}
+        self.deleted = {obj: {} for obj in ID_PREFIXES}
+        self.blobs = {}
+        self.counter = 0
+
+    def new_id(self, obj):
+        with self.lock:
+            self.counter += 1
+            return f"{ID_PREFIXES[obj]}{self.tag}{self.counter:011d}AAA"
+
+    def insert(self, obj, fields):
+        rec = dict(fields)
+        rec["Id"] = self.new_id(obj)
+        rec["SystemModstamp"] = rec["LastModifiedDate"] = now_stamp()
+        with self.lock:
+            self.tables[obj][rec["Id"]] = rec
+            if obj == "ExpressionSet":
+                self._create_definition(rec)
+        return rec["Id"]
+
+    def _create_definition(self, es):
+        api_name = es.get("ApiName")
+        if any(r.get("DeveloperName") == api_name for r in self.tables["ExpressionSetDefinition"].values()):
+            return
+        esd_id = self.insert("ExpressionSetDefinition", {"DeveloperName": api_name, "MasterLabel": api_name})
+        es["ExpressionSetDefinitionId"] = esd_id
+        self.insert("ExpressionSetDefinitionVersion", {
+            "DeveloperName": f"{api_name}_V1", "ExpressionSetDefinitionId": esd_id, "VersionNumber": 1,
+            "Language": "en_US", "MasterLabel": api_name, "Status": "Draft",
+        })
+
+    def update(self, obj, record_id, fields):
+        with self.lock:
+            rec = self.tables[obj].get(record_id)
+            if rec is None:
+                return False
+            for k, v in fields.items():
+                if k == "ConstraintModel" and obj == "ExpressionSetDefinitionVersion":
+                    self.blobs[record_id] = base64.b64decode(v)
+                elif k not in ("Id", "attributes"):
+                    rec[k] = v
+            rec["SystemModstamp"] = rec["LastModifiedDate"] = now_stamp()
+            return True
+
+    def delete(self, obj, record_id):
+        with self.lock:
+            rec = self.tables[obj].pop(record_id, None)
+            if rec is None:
+                return False
+            rec["SystemModstamp"] = now_stamp()
+            self.deleted[obj][record_id] = rec
+            return True
+
+    def find_object(self, record_id):
+        for obj, prefix in ID_PREFIXES.items():
+            if record_id.startswith(prefix):
+                return obj
+        return None
+
+    # --- field access incl. parent relationships ---
+    def field_value(self, obj, rec, path, base_url):
+        if path == "ConstraintModel" and obj == "ExpressionSetDefinitionVersion":
+            return f"{base_url}/sobjects/ExpressionSetDefinitionVersion/{rec['Id']}/ConstraintModel"
+        if path == "IsDeleted":
+            return rec["Id"] in self.deleted[obj]
+        if "." in path:
+            rel, rest = path.split(".", 1)
+            target_obj, lookup = RELATIONSHIPS.get(obj, {}).get(rel, (None, None))
+            if not target_obj:
+                return None
+            parent = self.tables[target_obj].get(rec.get(lookup) or "")
+            if parent is None:
+                return None
+            return self.field_value(target_obj, parent, rest, base_url)
+        return rec.get(path)
+
+
+# === Minimal SOQL ===
+SOQL_RE = re.compile(r"^\s*SELECT\s+(.*?)\s+FROM\s+(\w+)(?:\s+WHERE\s+(.*?))?(?:\s+ORDER\s+BY\s+.*?)?(?:\s+LIMIT\s+(\d+))?\s*$",
+                     re.IGNORECASE | re.DOTALL)
+COND_RE = re.compile(r"^\s*([\w.]+)\s*(=|!=|>=|<=|>|<|\s+IN\s+|\s+NOT\s+IN\s+|\s+LIKE\s+)\s*(.*?)\s*$", re.IGNORECASE | re.DOTALL)
+LITERAL_RE = re.compile(r"'((?:[^'\\]|\\.)*)'|([^,\s()]+)")
+
+
+def split_and(where):
+    parts, depth, quote, cur, i = [], 0, False, "", 0
+    while i < len(where):
+        ch = where[i]
+        if ch == "'" and (i == 0 or where[i - 1] != "\\"):
+            quote = not quote
+        if not quote:
+            if ch == "(":
+                depth += 1
+            elif ch == ")":
+                depth -= 1
+            elif depth == 0 and where[i:i + 5].upper() == " AND ":
+                parts.append(cur)
+                cur, i = "", i + 5
+                continue
+        cur += ch
+        i += 1
+    parts.append(cur)
+    return parts
+
+
+def parse_literal(token):
+    m = LITERAL_RE.match(token.strip())
+    if m.group(1) is not None:
+        return m.group(1).replace("\\'", "'").replace("\\\\", "\\")
+    raw = m.group(2)
+    if raw.lower() in ("null",):
+        return None
+    if raw.lower() in ("true", "false"):
+        return raw.lower() == "true"
+    try:
+        return float(raw) if "." in raw and "T" not in raw else int(raw)
+    except ValueError:
+        return raw  # datetime literal
+
+
+def parse_list(token):
+    inner = token.strip()[1:-1]
+    return [parse_literal(m.group(0)) for m in LITERAL_RE.finditer(inner)]
+
+
+def like_to_re(pattern):
+    return re.compile("^" + re.escape(pattern).replace("%", ".*").replace("_", ".") + "$", re.IGNORECASE)
+
+
+def compare(value, op, lit):
+    op = op.strip().upper()
+    if isinstance(lit, (int, float)) and value not in (None, ""):
+        value = float(value)
+        lit = float(lit)
+    if op == "=":
+        return value == lit
+    if op == "!=":
+        return value != lit
+    if op == "IN":
+        return value in lit
+    if op == "NOT IN":
+        return value not in lit
+    if op == "LIKE":
+        return value is not None and bool(like_to_re(lit).match(str(value)))
+    if value is None:
+        return False
+    value, lit = str(value)[:19] if op in "<>=" else value, str(lit)[:19]
+    return {">": value > lit, "<": value < lit, ">=": value >= lit, "<=": value <= lit}[op]
+
+
+def run_soql(org, soql, base_url, include_deleted=False):
+    m = SOQL_RE.match(" ".join(soql.split()))
+    if not m:
+        raise ValueError(f"MALFORMED_QUERY: {soql}")
+    select, obj, where, limit = m.groups()
+    fields = [f.strip() for f in select.split(",")]
+    conds = []
+    for part in split_and(where) if where else []:
+        cm = COND_RE.match(part)
+        if not cm:
+            raise ValueError(f"MALFORMED_QUERY: unsupported condition {part}")
+        field, op, lit = cm.groups()
+        lit = parse_list(lit) if op.strip().upper() in ("IN", "NOT IN") else parse_literal(lit)
+        conds.append((field, op, lit))
+    with org.lock:
+        rows = list(org.tables[obj].values())
+        if include_deleted:
+            rows += list(org.deleted[obj].values())
+    matched = [r for r in rows if all(compare(org.field_value(obj, r, f, base_url), op, lit) for f, op, lit in conds)]
+    if limit:
+        matched = matched[:int(limit)]
+    if fields == ["COUNT()"]:
+        return len(matched), None
+    out = []
+    for r in matched:
+        rec = {"attributes": {"type": obj, "url": f"{base_url}/sobjects/{obj}/{r['Id']}"}}
+        for f in fields:
+            if "." in f:
+                rel, child = f.split(".", 1)
+                target_obj, lookup = RELATIONSHIPS.get(obj, {}).get(rel, (None, None))
+                parent = org.tables[target_obj].get(r.get(lookup) or "") if target_obj else None
+                if parent is None:
+                    rec[rel] = None
+                else:
+                    rec.setdefault(rel, {"attributes": {"type": target_obj}})[child] = org.field_value(target_obj, parent, child, base_url)
+            else:
+                rec[f] = org.field_value(obj, r, f, base_url)
+        out.append(rec)
+    return out, fields
+
+
+# === Synthetic dataset ===
+CML_HEADER = "type LineItem;\n\n"
+
+
+def synthetic_cml(n_types, attrs_per_type):
+    parts = [CML_HEADER, "type Bundle : LineItem {\n"]
+    for i in range(n_types):
+        parts.append(f"    relation item{i} : Item{i}[0..9999];\n\n")
+    parts.append("}\n\n")
+    for i in range(n_types):
+        parts.append(f"type Item{i} : LineItem {{\n")
+        for a in range(attrs_per_type):
+            parts.append(f'    @(defaultValue = "A", attributeSource = "PCM")\n    string Attr_{a} = ["A", "B", "C"];\n\n')
+        parts.append("}\n\n")
+    return "".join(parts).encode("utf-8")
+
+
+def seed(org, products, classifications, prcs, escs, es_name, cml_types, cml_attrs, is_source):
+    rel_type = org.insert("ProductRelationshipType", {"Name": "Bundle to Bundle Component Relationship"})
+    org.insert("ContextDefinition", {"DeveloperName": "SalesTransactionContext_Ext"})
+    prod_ids = [org.insert("Product2", {"Name": f"Product {i:06d}"}) for i in range(products)]
+    class_ids = [org.insert("ProductClassification", {"Name": f"Classification {i:05d}"}) for i in range(classifications)]
+    prc_ids = []
+    for i in range(prcs):
+        parent = prod_ids[0]
+        prc_ids.append(org.insert("ProductRelatedComponent", {
+            "Name": f"PRC {i}", "ParentProductId": parent,
+            "ChildProductId": prod_ids[1 + i % max(1, products - 1)] if products > 1 else None,
+            "ChildProductClassificationId": None, "ProductRelationshipTypeId": rel_type, "Sequence": i,
+        }))
+    if not is_source:
+        return
+    es_id = org.insert("ExpressionSet", {
+        "ApiName": es_name, "Name": es_name, "Description": "", "InterfaceSourceType": "Constraint",
+        "ResourceInitializationType": "Off", "UsageType": "Bundle",
+    })
+    esd_id = org.tables["ExpressionSet"][es_id]["ExpressionSetDefinitionId"]
+    cd_id = next(iter(org.tables["ContextDefinition"]))
+    org.insert("ExpressionSetDefinitionContextDefinition", {
+        "ContextDefinitionApiName": "SalesTransactionContext_Ext", "ContextDefinitionId": cd_id,
+        "ExpressionSetApiName": es_name, "ExpressionSetDefinitionId": esd_id,
+    })
+    esdv_id = next(r["Id"] for r in org.tables["ExpressionSetDefinitionVersion"].values()
+                   if r["ExpressionSetDefinitionId"] == esd_id)
+    org.blobs[esdv_id] = synthetic_cml(cml_types, cml_attrs)
+    pools = [("Type", prod_ids), ("Type", class_ids), ("Port", prc_ids)]
+    for i in range(escs):
+        tag_type, pool = pools[i % 3] if pools[i % 3][1] else pools[0]
+        org.insert("ExpressionSetConstraintObj", {
+            "Name": f"ESC {i}", "ExpressionSetId": es_id, "ReferenceObjectId": pool[i % len(pool)],
+            "ConstraintModelTag": f"Item{i}", "ConstraintModelTagType": tag_type,
+        })
+
+
+# === HTTP ===
+class MockState:
+    def __init__(self, org, latency_ms, page_size, fail_rate, api_limit):
+        self.org = org
+        self.latency = latency_ms / 1000.0
+        self.page_size = page_size
+        self.fail_rate = fail_rate
+        self.api_limit = api_limit
+        self.cursors = {}
+        self.jobs = {}
+        self.stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.stats = {"calls": 0, "bytes_in": 0, "bytes_out": 0, "by_endpoint": {}}
+
+    def record(self, key, bytes_in, bytes_out):
+        with self.stats_lock:
+            self.stats["calls"] += 1
+            self.stats["bytes_in"] += bytes_in
+            self.stats["bytes_out"] += bytes_out
+            self.stats["by_endpoint"][key] = self.stats["by_endpoint"].get(key, 0) + 1
+
+
+def make_handler(state):
+    org = state.org
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        # --- plumbing ---
+        def _body(self):
+            if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                chunks = []
+                while True:
+                    size = int(self.rfile.readline().strip() or b"0", 16)
+                    if size == 0:
+                        self.rfile.readline()
+                        break
+                    chunks.append(self.rfile.read(size))
+                    self.rfile.readline()
+                return b"".join(chunks)
+            length = int(self.headers.get("Content-Length") or 0)
+            return self.rfile.read(length) if length else b""
+
+        def _send(self, status, payload=None, raw=None, content_type="application/json", extra_headers=None):
+            data = raw if raw is not None else (json.dumps(payload).encode() if payload is not None else b"")
+            self.send_response(status)
+            if data:
+                self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Sforce-Limit-Info", f"api-usage={state.stats['calls']}/{state.api_limit}")
+            for k, v in (extra_headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            if data:
+                self.wfile.write(data)
+            self._bytes_out = len(data)
+
+        def _error(self, status, code, message):
+            self._send(status, [{"errorCode": code, "message": message}])
+
+        def _dispatch(self, method):
+            self._bytes_out = 0
+            parsed = urlparse(self.path)
+            path, qs = parsed.path, parse_qs(parsed.query)
+            body = self._body() if method in ("POST", "PATCH", "PUT") else b""
+            if path.startswith("/__"):
+                return self._admin(method, path)
+            if state.latency:
+                time.sleep(state.latency)
+            key = self._endpoint_key(method, path)
+            try:
+                if self.headers.get("Authorization") != "Bearer mock-token" and path != "/services/data/":
+                    return self._error(401, "INVALID_SESSION_ID", "Session expired or invalid")
+                row_lock_post = method == "POST" and path.endswith(ROW_LOCK_ENDPOINTS)
+                if state.fail_rate and method != "GET" and not row_lock_post and random.random() < state.fail_rate:
+                    if method in REPLAYABLE_METHODS:
+                        return self._error(503, "SERVER_UNAVAILABLE", "injected failure")
+                    return self._error(429, "REQUEST_LIMIT_EXCEEDED", "injected failure")
+                self._route(method, path, qs, body)
+            except ValueError as e:
+                self._error(400, "MALFORMED_QUERY", str(e))
+            finally:
+                state.record(key, len(body), self._bytes_out)
+
+        def _endpoint_key(self, method, path):
+            p = re.sub(r"/v\d+\.\d+", "", path)
+            p = re.sub(r"/[0-9A-Za-z]{18}(?=/|$)", "/{id}", p)
+            p = re.sub(r"/query/[\w-]+", "/query/{locator}", p)
+            p = re.sub(r"/jobs/(ingest|query)/[\w-]+", r"/jobs/\1/{job}", p)
+            return f"{method} {p}"
+
+        def _admin(self, method, path):
+            if path == "/__stats":
+                return self._send(200, state.stats)
+            if path == "/__reset":
+                state.reset_stats()
+                return self._send(200, {"ok": True})
+            self._send(404, {"error": "unknown"})
+
+        def _base(self):
+            return f"/services/data/v{API_VERSION}"
+
+        # --- routes ---
+        def _route(self, method, path, qs, body):
+            if path == "/services/data/":
+                return self._send(200, [{"version": "63.0"}, {"version": API_VERSION}])
+            m = re.match(r"^/services/data/v[\d.]+(/.*)$", path)
+            if not m:
+                return self._send(404, [{"errorCode": "NOT_FOUND"}])
+            rest = m.group(1)
+            if rest in ("/query", "/queryAll") and method == "GET":
+                return self._query(qs["q"][0], include_deleted=rest == "/queryAll")
+            qm = re.match(r"^/query/([\w-]+)$", rest)
+            if qm:
+                return self._next_page(qm.group(1))
+            if rest == "/composite/sobjects":
+                return self._collections(method, qs, body)
+            if rest == "/composite/graph" and method == "POST":
+                return self._graph(json.loads(body))
+            if rest.startswith("/jobs/"):
+                return self._jobs(method, rest, qs, body)
+            sm = re.match(r"^/sobjects/(\w+)/?([\w]*)/?(\w*)$", rest)
+            if sm:
+                return self._sobject(method, sm.group(1), sm.group(2), sm.group(3), body)
+            self._send(404, [{"errorCode": "NOT_FOUND", "message": rest}])
+
+        def _query(self, soql, include_deleted=False):
+            records, fields = run_soql(org, soql, self._base(), include_deleted)
+            if fields is None:
+                return self._send(200, {"totalSize": records, "done": True, "records": []})
+            self._page(records, 0, str(uuid.uuid4()))
+
+        def _page(self, records, offset, cursor):
+            page = records[offset:offset + state.page_size]
+            done = offset + state.page_size >= len(records)
+            payload = {"totalSize": len(records), "done": done, "records": page}
+            if not done:
+                state.cursors[cursor] = records
+                payload["nextRecordsUrl"] = f"{self._base()}/query/{cursor}-{offset + state.page_size}"
+            else:
+                state.cursors.pop(cursor, None)
+            self._send(200, payload)
+
+        def _next_page(self, locator):
+            cursor, offset = locator.rsplit("-", 1)
+            records = state.cursors.get(cursor)
+            if records is None:
+                return self._error(400, "INVALID_QUERY_LOCATOR", "invalid query locator")
+            self._page(records, int(offset), cursor)
+
+        def _sobject(self, method, obj, record_id, sub, body):
+            if obj not in ID_PREFIXES:
+                return self._error(404, "NOT_FOUND", obj)
+            if method == "GET" and record_id and sub == "ConstraintModel":
+                blob = org.blobs.get(record_id)
+                if blob is None:
+                    return self._error(404, "NOT_FOUND", "no blob")
+                return self._send(200, raw=blob, content_type="application/octetstream")
+            if method == "GET" and record_id:
+                rec = org.tables[obj].get(record_id)
+                return self._send(200, rec) if rec else self._error(404, "NOT_FOUND", record_id)
+            if method == "POST" and not record_id:
+                new_id = org.insert(obj, json.loads(body))
+                return self._send(201, {"id": new_id, "success": True, "errors": []})
+            if method == "PATCH" and record_id:
+                ok = org.update(obj, record_id, json.loads(body))
+                return self._send(204) if ok else self._error(404, "NOT_FOUND", record_id)
+            if method == "DELETE" and record_id:
+                ok = org.delete(obj, record_id)
+                return self._send(204) if ok else self._error(404, "ENTITY_IS_DELETED", record_id)
+            self._error(405, "METHOD_NOT_ALLOWED", method)
+
+        def _collections(self, method, qs, body):
+            results = []
+            if method == "DELETE":
+                ids = qs.get("ids", [""])[0].split(",")
+                if len(ids) > 200:
+                    return self._error(400, "EXCEEDED_ID_LIMIT", "more than 200 ids")
+                for rid in ids:
+                    obj = org.find_object(rid)
+                    ok = bool(obj) and org.delete(obj, rid)
+                    results.append({"id": rid, "success": ok,
+                                    "errors": [] if ok else [{"statusCode": "ENTITY_IS_DELETED", "message": "entity is deleted"}]})
+                return self._send(200, results)
+            payload = json.loads(body)
+            records = payload.get("records", [])
+            if len(records) > 200:
+                return self._error(400, "EXCEEDED_ID_LIMIT", "more than 200 records")
+            for rec in records:
+                obj = rec.get("attributes", {}).get("type")
+                fields = {k: v for k, v in rec.items() if k != "attributes"}
+                if method == "POST":
+                    if state.fail_rate and random.random() < state.fail_rate:
+                        results.append({"success": False, "errors": [{"statusCode": "UNABLE_TO_LOCK_ROW", "message": "injected"}]})
+                        continue
+                    results.append({"id": org.insert(obj, fields), "success": True, "errors": []})
+                elif method == "PATCH":
+                    ok = org.update(obj, fields.get("Id", ""), fields)
+                    results.append({"id": fields.get("Id"), "success": ok,
+                                    "errors": [] if ok else [{"statusCode": "ENTITY_IS_DELETED", "message": "not found"}]})
+            self._send(200, results)
+
+        def _graph(self, payload):
+            out = []
+            for graph in payload.get("graphs", []):
+                refs, responses, ok = {}, [], True
+                snapshot = {o: dict(t) for o, t in org.tables.items()}, {o: dict(t) for o, t in org.deleted.items()}, dict(org.blobs)
+                nodes = graph.get("compositeRequest", [])
+                # Injected row lock on one node rolls the whole graph back
+                locked = random.randrange(len(nodes)) if nodes and state.fail_rate and random.random() < state.fail_rate else -1
+                for index, sub in enumerate(nodes):
+                    def subst(value):
+                        if isinstance(value, str):
+                            return re.sub(r"@\{(\w+)\.(\w+)\}", lambda m: str(refs.get(m.group(1), {}).get(m.group(2), "")), value)
+                        if isinstance(value, dict):
+                            return {k: subst(v) for k, v in value.items()}
+                        return value
+                    url = subst(sub["url"])
+                    body = subst(sub.get("body") or {})
+                    if index == locked:
+                        status, res = 400, [{"errorCode": "UNABLE_TO_LOCK_ROW", "message": "injected"}]
+                    else:
+                        status, res = self._graph_call(sub["method"], url, body)
+                    refs[sub["referenceId"]] = res if isinstance(res, dict) else {}
+                    responses.append({"body": res, "httpHeaders": {}, "httpStatusCode": status, "referenceId": sub["referenceId"]})
+                    if status >= 400:
+                        ok = False
+                        break
+                if not ok:
+                    org.tables, org.deleted, org.blobs = snapshot
+                out.append({"graphId": graph["graphId"], "graphResponse": {"compositeResponse": responses}, "isSuccessful": ok})
+            self._send(200, {"graphs": out})
+
+        def _graph_call(self, method, url, body):
+            m = re.match(r"^/services/data/v[\d.]+/sobjects/(\w+)/?(\w*)$", url)
+            if not m or m.group(1) not in ID_PREFIXES:
+                return 404, [{"errorCode": "NOT_FOUND", "message": url}]
+            obj, record_id = m.groups()
+            if method == "POST":
+                return 201, {"id": org.insert(obj, body), "success": True, "errors": []}
+            if method == "PATCH":
+                return (204, None) if org.update(obj, record_id, body) else (404, [{"errorCode": "NOT_FOUND"}])
+            if method == "DELETE":
+                return (204, None) if org.delete(obj, record_id) else (404, [{"errorCode": "ENTITY_IS_DELETED"}])
+            return 405, [{"errorCode": "METHOD_NOT_ALLOWED"}]
+
+        def _jobs(self, method, rest, qs, body):
+            m = re.match(r"^/jobs/(ingest|query)/?([\w-]*)/?(\w*)$", rest)
+            kind, job_id, sub = m.groups()
+            if method == "POST" and not job_id:
+                spec = json.loads(body)
+                job_id = uuid.uuid4().hex[:18]
+                job = {"id": job_id, "state": "Open" if kind == "ingest" else "UploadComplete", **spec, "data": b""}
+                if kind == "query":
+                    records, fields = run_soql(org, spec["query"], self._base())
+                    job["records"], job["fields"], job["state"] = records, fields, "JobComplete"
+                    job["numberRecordsProcessed"] = len(records)
+                state.jobs[job_id] = job
+                return self._send(200, {k: v for k, v in job.items() if k not in ("data", "records", "fields")})
+            job = state.jobs.get(job_id)
+            if job is None:
+                return self._error(404, "NOT_FOUND", job_id)
+            if kind == "ingest" and sub == "batches" and method == "PUT":
+                job["data"] += body
+                return self._send(201)
+            if kind == "ingest" and method == "PATCH":
+                job["state"] = json.loads(body)["state"]
+                if job["state"] == "UploadComplete":
+                    self._run_ingest(job)
+                return self._send(200, {k: v for k, v in job.items() if k not in ("data", "failed", "ok")})
+            if kind == "ingest" and sub == "failedResults":
+                buf = io.StringIO()
+                w = csv.writer(buf, lineterminator="\n")
+                w.writerow(["sf__Id", "sf__Error", "Id"])
+                for rid in job.get("failed", []):
+                    w.writerow([rid, "ENTITY_IS_DELETED:entity is deleted", rid])
+                return self._send(200, raw=buf.getvalue().encode(), content_type="text/csv")
+            if kind == "query" and sub == "results":
+                return self._query_results(job, qs)
+            if method == "GET":
+                return self._send(200, {k: v for k, v in job.items() if k not in ("data", "records", "fields", "failed", "ok")})
+            self._error(405, "METHOD_NOT_ALLOWED", method)
+
+        def _run_ingest(self, job):
+            rows = list(csv.DictReader(io.StringIO(job["data"].decode())))
+            failed = []
+            for row in rows:
+                rid = row.get("Id", "")
+                obj = org.find_object(rid)
+                if not (obj and org.delete(obj, rid)):
+                    failed.append(rid)
+            job["failed"] = failed
+            job["state"] = "JobComplete"
+            job["numberRecordsProcessed"] = len(rows)
+            job["numberRecordsFailed"] = len(failed)
+
+        def _query_results(self, job, qs):
+            max_records = int(qs.get("maxRecords", [str(state.page_size)])[0])
+            offset = int(qs.get("locator", ["0"])[0] or 0)
+            records = job["records"][offset:offset + max_records]
+            buf = io.StringIO()
+            w = csv.writer(buf, quoting=csv.QUOTE_ALL, lineterminator="\n")
+            w.writerow(job["fields"])
+            for rec in records:
+                row = []
+                for f in job["fields"]:
+                    if "." in f:
+                        rel, child = f.split(".", 1)
+                        row.append((rec.get(rel) or {}).get(child) or "")
+                    else:
+                        v = rec.get(f)
+                        row.append("" if v is None else v)
+                w.writerow(row)
+            nxt = offset + max_records
+            locator = str(nxt) if nxt < len(job["records"]) else "null"
+            self._send(200, raw=buf.getvalue().encode(), content_type="text/csv",
+                       extra_headers={"Sforce-Locator": locator, "Sforce-NumberOfRecords": str(len(records))})
+
+        def do_GET(self):
+            self._dispatch("GET")
+
+        def do_POST(self):
+            self._dispatch("POST")
+
+        def do_PATCH(self):
+            self._dispatch("PATCH")
+
+        def do_PUT(self):
+            self._dispatch("PUT")
+
+        def do_DELETE(self):
+            self._dispatch("DELETE")
+
+    return Handler
+
+
+# === Dataset / server options shared by the CLI and the benchmark harness ===
+DEFAULTS = {
+    "latency_ms": 0, "page_size": 2000, "fail_rate": 0, "api_limit": 15000,
+    "products": 50, "classifications": 10, "prcs": 20, "escs": 100,
+    "es_name": "Laptop_Pro_Bundle", "cml_types": 50, "cml_attrs": 5,
+}
+
+
+def add_options(parser):
+    parser.add_argument("--latency-ms", type=float, default=DEFAULTS["latency_ms"], help="Added to every API call")
+    parser.add_argument("--page-size", type=int, default=DEFAULTS["page_size"], help="Records per /query page")
+    parser.add_argument("--fail-rate", type=float, default=DEFAULTS["fail_rate"],
+                        help="Share of writes that fail: 503 for PUT/PATCH/DELETE, a row lock on collection "
+                             "records and graphs, 429 for other POSTs")
+    parser.add_argument("--api-limit", type=int, default=DEFAULTS["api_limit"], help="Daily allowance in Sforce-Limit-Info")
+    parser.add_argument("--products", type=int, default=DEFAULTS["products"])
+    parser.add_argument("--classifications", type=int, default=DEFAULTS["classifications"])
+    parser.add_argument("--prcs", type=int, default=DEFAULTS["prcs"])
+    parser.add_argument("--escs", type=int, default=DEFAULTS["escs"], help="ExpressionSetConstraintObj rows in the source set")
+    parser.add_argument("--es-name", default=DEFAULTS["es_name"])
+    parser.add_argument("--cml-types", type=int, default=DEFAULTS["cml_types"], help="Types in the synthetic CML blob")
+    parser.add_argument("--cml-attrs", type=int, default=DEFAULTS["cml_attrs"], help="Attributes per CML type")
+
+
+# Seeds an org and serves it from a background thread; port 0 picks a free port
+def start_mock_org(role, port=0, **options):
+    opts = dict(DEFAULTS, **options)
+    org = MockOrg("S" if role == "source" else "T")
+    seed(org, opts["products"], opts["classifications"], opts["prcs"], opts["escs"], opts["es_name"],
+         opts["cml_types"], opts["cml_attrs"], is_source=role == "source")
+    state = MockState(org, opts["latency_ms"], opts["page_size"], opts["fail_rate"], opts["api_limit"])
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Salesforce REST endpoints used by the CML tools")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--role", choices=["source", "target"], default="source",
+                        help="A source org holds the Expression Set; a target org only has the products and classifications")
+    add_options(parser)
+    args = parser.parse_args()
+
+    options = {key: getattr(args, key) for key in DEFAULTS}
+    server, _ = start_mock_org(args.role, args.port, **options)
+    print(f"🧪 Mock {args.role} org listening on http://127.0.0.1:{server.server_port}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+from mock_sf_server import start_mock_org, add_options, DEFAULTS, API_VERSION
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_ALIAS = "bench-source"
+TARGET_ALIAS = "bench-target"
+DEFAULT_TOLERANCE = 0.25  # allowed wall-time growth over the baseline before it counts as a regression
+
+
+# === One isolated workspace per cycle: session, ID, model and blob caches never leak between runs ===
+def seed_session(cache_dir, alias, server):
+    # Pre-resolved sessions, so the tools never shell out to the sf CLI
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, f"{alias}.json"), "w", encoding="utf-8") as f:
+        json.dump({"access_token": "mock-token", "instance_url": f"http://127.0.0.1:{server.server_port}",
+                   "api_version": API_VERSION, "fetched_at": time.time()}, f)
+
+
+def tool_env(work_dir):
+    env = dict(os.environ)
+    env.update({
+        "CML_SESSION_CACHE_DIR": os.path.join(work_dir, "sessions"),
+        "CML_ID_CACHE_PATH": os.path.join(work_dir, "id_cache.sqlite"),
+        "CML_MODEL_CACHE_DIR": os.path.join(work_dir, "models"),
+        "CML_BLOB_CACHE_DIR": os.path.join(work_dir, "blobs"),
+        "PYTHONUNBUFFERED": "1",
+    })
+    return env
+
+
+def run_step(name, script, args, work_dir, env, mock):
+    profile_path = os.path.join(work_dir, f"{name}.profile.json")
+    log_path = os.path.join(work_dir, f"{name}.log")
+    mock.reset_stats()
+    started = time.monotonic()
+    with open(log_path, "w", encoding="utf-8") as log:
+        code = subprocess.run([sys.executable, os.path.join(REPO_DIR, script), *args, "--profile", profile_path],
+                              cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT).returncode
+    seconds = time.monotonic() - started
+    server = mock.stats
+    try:
+        with open(profile_path, encoding="utf-8") as f:
+            client = json.load(f)["totals"]
+    except (OSError, ValueError, KeyError):
+        client = {}
+    # Bytes from the tool's side: request bodies sent, response bodies received
+    return {"step": name, "ok": code == 0, "seconds": round(seconds, 3), "calls": server["calls"],
+            "bytes_sent": server["bytes_in"], "bytes_received": server["bytes_out"], "by_endpoint": server["by_endpoint"],
+            "retries": client.get("retries"), "p50_ms": client.get("p50_ms"), "p95_ms": client.get("p95_ms"),
+            "log": log_path}
+
+
+# === export → import (cold) → re-import (nothing changed) against fresh mock orgs ===
+def run_cycle(options, tool_args, keep=False):
+    work_dir = tempfile.mkdtemp(prefix="cml-bench-")
+    source, source_state = start_mock_org("source", **options)
+    target, target_state = start_mock_org("target", **options)
+    try:
+        seed_session(os.path.join(work_dir, "sessions"), SOURCE_ALIAS, source)
+        seed_session(os.path.join(work_dir, "sessions"), TARGET_ALIAS, target)
+        env = tool_env(work_dir)
+        data = os.path.join(work_dir, "data")
+        data_arg = data + ".cmlbundle" if tool_args.bundle else data
+
+        export_args = ["--developerName", options["es_name"], "--alias", SOURCE_ALIAS, "--outputDir", data,
+                       "--engine", tool_args.engine] + (["--bundle"] if tool_args.bundle else [])
+        import_args = ["--dataDir", data_arg, "--alias", TARGET_ALIAS] + (["--noGraph"] if tool_args.noGraph else [])
+        steps = [run_step("export", "export_cml.py", export_args, work_dir, env, source_state)]
+        for name in ("import", "reimport"):
+            if not steps[-1]["ok"]:
+                break
+            steps.append(run_step(name, "import_cml.py", import_args, work_dir, env, target_state))
+            written = len(target_state.org.tables["ExpressionSetConstraintObj"])
+            if written != options["escs"]:
+                steps[-1]["ok"] = False
+                steps[-1]["error"] = f"target holds {written} constraint objects, expected {options['escs']}"
+        return steps
+    finally:
+        source.shutdown()
+        target.shutdown()
+        if not keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def summarise(cycles, options):
+    # Median over repeats per step; call counts are deterministic without injected failures
+    summary = {}
+    for name in ("export", "import", "reimport"):
+        runs = [step for steps in cycles for step in steps if step["step"] == name]
+        if not runs:
+            continue
+        seconds = statistics.median(r["seconds"] for r in runs)
+        summary[name] = {
+            "ok": all(r["ok"] for r in runs), "runs": len(runs), "seconds": round(seconds, 3),
+            "min_seconds": min(r["seconds"] for r in runs), "max_seconds": max(r["seconds"] for r in runs),
+            "rows_per_second": round(options["escs"] / seconds, 1) if seconds else None,
+            "calls": max(r["calls"] for r in runs), "retries": sum(r["retries"] or 0 for r in runs),
+            "bytes_sent": runs[-1]["bytes_sent"], "bytes_received": runs[-1]["bytes_received"],
+            "p50_ms": runs[-1]["p50_ms"], "p95_ms": runs[-1]["p95_ms"], "by_endpoint": runs[-1]["by_endpoint"],
+        }
+    return summary
+
+
+def compare(summary, baseline, tolerance):
+    regressions = []
+    for name, current in summary.items():
+        before = baseline.get("steps", {}).get(name)
+        if not before:
+            continue
+        if current["calls"] > before["calls"]:
+            regressions.append(f"{name}: {current['calls']} API calls (baseline {before['calls']})")
+        if current["seconds"] > before["seconds"] * (1 + tolerance):
+            regressions.append(f"{name}: {current['seconds']:.2f}s (baseline {before['seconds']:.2f}s, "
+                               f"+{tolerance:.0%} allowed)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the export → import cycle against local mock orgs")
+    add_options(parser)
+    parser.add_argument("--repeat", type=int, default=3, help="Cycles to run; step times are the median")
+    parser.add_argument("--engine", choices=("auto", "rest", "bulk"), default="auto", help="Passed to export_cml.py")
+    parser.add_argument("--noGraph", action="store_true", help="Import through sObject Collections instead of Composite Graph")
+    parser.add_argument("--bundle", action="store_true", help="Export a .cmlbundle and import from it")
+    parser.add_argument("--output", type=str, help="Write the results as JSON (usable as a later --baseline)")
+    parser.add_argument("--baseline", type=str, help="Results JSON of an earlier run; exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Wall-time growth over the baseline still accepted (API call counts must not grow)")
+    parser.add_argument("--keep", action="store_true", help="Keep each cycle's work folder (logs, exports, profiles)")
+    args = parser.parse_args()
+
+    options = {key: getattr(args, key) for key in DEFAULTS}
+    print(f"🏁 {args.repeat} cycle(s): {options['escs']} constraint objects, {options['cml_types']} CML types, "
+          f"{options['latency_ms']:g} ms latency, page size {options['page_size']}")
+    cycles = []
+    for n in range(1, args.repeat + 1):
+        steps = run_cycle(options, args, keep=args.keep)
+        cycles.append(steps)
+        print(f"  cycle {n}: " + ", ".join(f"{s['step']} {s['seconds']:.2f}s/{s['calls']} calls" for s in steps))
+        failed = next((s for s in steps if not s["ok"]), None)
+        if failed:
+            print(f"❌ {failed['step']} failed: {failed.get('error') or 'non-zero exit'} (log: {failed['log']})")
+            sys.exit(1)
+
+    summary = summarise(cycles, options)
+    print(f"{'step':<10}{'median s':>10}{'rows/s':>10}{'calls':>8}{'retries':>9}{'p50 ms':>9}{'p95 ms':>9}{'sent':>12}{'received':>12}")
+    for name, s in summary.items():
+        print(f"{name:<10}{s['seconds']:>10.2f}{s['rows_per_second'] or 0:>10.0f}{s['calls']:>8}{s['retries']:>9}"
+              f"{s['p50_ms'] or 0:>9.1f}{s['p95_ms'] or 0:>9.1f}{s['bytes_sent']:>12,}{s['bytes_received']:>12,}")
+
+    results = {"options": options, "engine": args.engine, "graph": not args.noGraph, "bundle": args.bundle,
+               "repeat": args.repeat, "python": sys.version.split()[0], "steps": summary}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"📄 Results saved to {args.output}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("options") != options:
+            print("⚠️ The baseline was recorded with different dataset/server options; the comparison may not be meaningful")
+        regressions = compare(summary, baseline, args.tolerance)
+        for line in regressions:
+            print(f"📉 Regression: {line}")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regression against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import importlib
+
+# Public names are loaded on first access, so `import cml_migration` pulls in neither requests nor
+# any tool module; a worker that only exports never imports the importer, pre-flight or CML parser.
+_LAZY = {
+    "MigrationClient": "client",
+    "ExportResult": "client",
+    "ImportResult": "client",
+    "BatchExportError": "exporter",
+    "ImportOptions": "importer",
+    "OrgResult": "importer",
+    "SessionPool": "sf_session",
+    "SalesforceApiError": "sf_session",
+    "RunProfile": "run_profile",
+    "open_export": "export_bundle",
+    "load_model": "cml_model",
+}
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
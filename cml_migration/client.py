@@ -0,0 +1,54 @@
+from collections import namedtuple
+from .sf_session import SessionPool, using_sessions, SESSION_CACHE_DIR, SESSION_CACHE_TTL
+from .run_profile import RunProfile, profiling
+from .output import output_to
+
+# What one client call returned, plus that call's own run profile (as written by --profile)
+ExportResult = namedtuple("ExportResult", ["dirs", "profile"])
+ImportResult = namedtuple("ImportResult", ["orgs", "profile"])
+
+
+# === Library entry point for long-running processes ===
+# One client serves many migrations back to back: org sessions (auth, API version, keep-alive
+# connections, request scheduler) stay warm in the client, while every call gets its own
+# options and run profile. Calls may run concurrently from several threads.
+# Progress lines go to `output` (any object with write/flush; sys.stdout when None), never to a patched sys.stdout.
+class MigrationClient:
+    def __init__(self, session_cache_dir=SESSION_CACHE_DIR, session_cache_ttl=SESSION_CACHE_TTL, output=None):
+        self.sessions = SessionPool(session_cache_dir, session_cache_ttl)
+        self.output = output
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.sessions.close()
+
+    def session(self, alias):
+        return self.sessions.get(alias)
+
+    def export(self, developer_names, profile_path=None, output=None, **kwargs):
+        # kwargs: version, alias, out_dir, workers, engine, incremental, bundle (see exporter.run_export)
+        from .exporter import run_export
+        dirs, profile = self._run(lambda: run_export(developer_names, **kwargs), profile_path, output)
+        return ExportResult(dirs, profile)
+
+    def import_into(self, data_dir, targets, profile_path=None, output=None, **options):
+        # options: the ImportOptions fields, e.g. noGraph=True, preflightOnly=True, preflightReport="report.json"
+        from .importer import run, ImportOptions
+        orgs, profile = self._run(lambda: run(data_dir, targets, ImportOptions(**options)), profile_path, output)
+        return ImportResult(orgs, profile)
+
+    def _run(self, fn, profile_path, output=None):
+        profile = RunProfile()
+        with using_sessions(self.sessions), profiling(profile), output_to(output or self.output):
+            try:
+                result = fn()
+            finally:
+                extra = {"orgs": self.sessions.stats()}
+                if profile_path:
+                    profile.write(profile_path, extra)
+        return result, profile.to_dict(extra)
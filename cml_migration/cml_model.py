@@ -0,0 +1,462 @@
+import os
+import re
+import sys
+import json
+import argparse
+import tempfile
+import threading
+from .blob_store import sha256_file
+
+MODEL_CACHE_DIR = os.environ.get(
+    "CML_MODEL_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cml_migration", "models")
+)
+MODEL_CACHE_VERSION = 1  # bump when the cached JSON layout changes
+
+# Statements inside a type body that are rules rather than declarations
+CONSTRAINT_KEYWORDS = frozenset((
+    "constraint", "message", "preference", "require", "exclude", "rule", "setdefault", "table", "action",
+))
+
+TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<comment>//.*)
+      | (?P<block>/\*)
+      | (?P<string>"(?:[^"\\]|\\.)*")
+      | (?P<number>\d+(?:\.\d+)?(?!\.\d))
+      | (?P<name>[A-Za-z_]\w*)
+      | (?P<op>\.\.|==|!=|<=|>=|&&|\|\||->|[{}()\[\];:,=@<>!+\-*/.?&|%^~])
+    )""", re.VERBOSE)
+
+
+class CmlParseError(ValueError):
+    def __init__(self, message, line=None):
+        super().__init__(f"line {line}: {message}" if line else message)
+        self.line = line
+
+
+# === Model index: slotted classes, names -> declarations ===
+class CmlAttribute:
+    __slots__ = ("name", "type", "domain", "range", "expression", "annotations", "line")
+
+    def __init__(self, name, type, domain=(), range=None, expression=None, annotations=None, line=None):
+        self.name = name
+        self.type = type
+        self.domain = domain        # tuple of allowed literal values
+        self.range = range          # (low, high) for [a..b] domains
+        self.expression = expression  # computed value text for "= <expr>" attributes
+        self.annotations = annotations or {}
+        self.line = line
+
+    def to_dict(self):
+        return {"name": self.name, "type": self.type, "domain": list(self.domain),
+                "range": list(self.range) if self.range else None, "expression": self.expression,
+                "annotations": self.annotations, "line": self.line}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["name"], d["type"], tuple(d["domain"]), tuple(d["range"]) if d["range"] else None,
+                   d["expression"], d["annotations"], d["line"])
+
+
+class CmlRelation:
+    __slots__ = ("name", "target", "cardinality", "annotations", "line")
+
+    def __init__(self, name, target, cardinality=None, annotations=None, line=None):
+        self.name = name
+        self.target = target
+        self.cardinality = cardinality  # (min, max) or None when not declared; non-integer bounds stay strings
+        self.annotations = annotations or {}
+        self.line = line
+
+    def to_dict(self):
+        return {"name": self.name, "target": self.target,
+                "cardinality": list(self.cardinality) if self.cardinality else None,
+                "annotations": self.annotations, "line": self.line}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["name"], d["target"], tuple(d["cardinality"]) if d["cardinality"] else None,
+                   d["annotations"], d["line"])
+
+
+class CmlType:
+    __slots__ = ("name", "parent", "attributes", "relations", "constraints", "annotations", "line")
+
+    def __init__(self, name, parent=None, annotations=None, line=None):
+        self.name = name
+        self.parent = parent
+        self.attributes = {}
+        self.relations = {}
+        self.constraints = []  # (keyword, line)
+        self.annotations = annotations or {}
+        self.line = line
+
+    def to_dict(self):
+        return {"name": self.name, "parent": self.parent, "annotations": self.annotations, "line": self.line,
+                "attributes": [a.to_dict() for a in self.attributes.values()],
+                "relations": [r.to_dict() for r in self.relations.values()],
+                "constraints": [list(c) for c in self.constraints]}
+
+    @classmethod
+    def from_dict(cls, d):
+        t = cls(d["name"], d["parent"], d["annotations"], d["line"])
+        t.attributes = {a["name"]: CmlAttribute.from_dict(a) for a in d["attributes"]}
+        t.relations = {r["name"]: CmlRelation.from_dict(r) for r in d["relations"]}
+        t.constraints = [tuple(c) for c in d["constraints"]]
+        return t
+
+
+class CmlModel:
+    __slots__ = ("types", "sha256", "size", "_children")
+
+    def __init__(self, types, sha256=None, size=None):
+        self.types = types  # name -> CmlType, in declaration order
+        self.sha256 = sha256
+        self.size = size
+        self._children = None
+
+    def ancestors(self, name):
+        seen = []
+        parent = self.types[name].parent if name in self.types else None
+        while parent and parent not in seen:
+            seen.append(parent)
+            parent = self.types[parent].parent if parent in self.types else None
+        return seen
+
+    def subtypes(self, name):
+        if self._children is None:
+            children = {}
+            for t in self.types.values():
+                if t.parent:
+                    children.setdefault(t.parent, []).append(t.name)
+            self._children = children
+        return list(self._children.get(name, ()))
+
+    # Own + inherited declarations, nearest definition wins
+    def all_attributes(self, name):
+        merged = {}
+        for type_name in [name] + self.ancestors(name):
+            for attr_name, attr in self.types[type_name].attributes.items() if type_name in self.types else ():
+                merged.setdefault(attr_name, attr)
+        return merged
+
+    def all_relations(self, name):
+        merged = {}
+        for type_name in [name] + self.ancestors(name):
+            for rel_name, rel in self.types[type_name].relations.items() if type_name in self.types else ():
+                merged.setdefault(rel_name, rel)
+        return merged
+
+    def summary(self):
+        return {
+            "types": len(self.types),
+            "relations": sum(len(t.relations) for t in self.types.values()),
+            "attributes": sum(len(t.attributes) for t in self.types.values()),
+            "constraints": sum(len(t.constraints) for t in self.types.values()),
+        }
+
+    def to_dict(self):
+        return {"version": MODEL_CACHE_VERSION, "sha256": self.sha256, "size": self.size,
+                "types": [t.to_dict() for t in self.types.values()]}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls({t["name"]: CmlType.from_dict(t) for t in d["types"]}, d.get("sha256"), d.get("size"))
+
+
+# === Tokenizer: one line at a time, so a blob is never held in memory whole ===
+def tokenize(lines):
+    in_block = False
+    for line_no, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        pos, end = 0, len(line)
+        while pos < end:
+            if in_block:
+                close = line.find("*/", pos)
+                if close < 0:
+                    break
+                pos, in_block = close + 2, False
+                continue
+            m = TOKEN_RE.match(line, pos)
+            if not m:
+                if line[pos:].strip():
+                    raise CmlParseError(f"unexpected character {line[pos:].strip()[0]!r}", line_no)
+                break
+            pos = m.end()
+            kind = m.lastgroup
+            if kind == "comment":
+                break
+            if kind == "block":
+                in_block = True
+                continue
+            yield kind, m.group(kind), line_no
+
+
+# === Single-pass recursive descent parser ===
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.current = next(tokens, None)
+
+    def advance(self):
+        token = self.current
+        self.current = next(self.tokens, None)
+        return token
+
+    def peek(self, value):
+        return self.current is not None and self.current[1] == value
+
+    def expect(self, value=None, kind=None):
+        token = self.current
+        if token is None:
+            raise CmlParseError(f"unexpected end of model, expected {value or kind}")
+        if (value and token[1] != value) or (kind and token[0] != kind):
+            raise CmlParseError(f"expected {value or kind}, found {token[1]!r}", token[2])
+        return self.advance()
+
+    def skip_statement(self):
+        # Up to and including the ';' that closes this statement at bracket depth 0
+        depth, text = 0, []
+        while self.current is not None:
+            kind, value, line = self.advance()
+            if kind == "op" and value in ("(", "{", "["):
+                depth += 1
+            elif kind == "op" and value in (")", "}", "]"):
+                depth -= 1
+            elif value == ";" and depth <= 0:
+                return " ".join(text)
+            text.append(value)
+        raise CmlParseError("unterminated statement")
+
+    def literal(self):
+        kind, value, line = self.advance()
+        if kind == "string":
+            return json.loads(value) if "\\" in value else value[1:-1]
+        if value == "-" and self.current and self.current[0] == "number":
+            return "-" + self.advance()[1]
+        return value
+
+    def annotations(self):
+        # @(key = value, ...)
+        self.expect("@")
+        self.expect("(")
+        result = {}
+        while not self.peek(")"):
+            key = self.expect(kind="name")[1]
+            value = True
+            if self.peek("="):
+                self.advance()
+                value = self.literal()
+            result[key] = value
+            if self.peek(","):
+                self.advance()
+        self.expect(")")
+        return result
+
+    def model(self):
+        types = {}
+        pending = {}
+        while self.current is not None:
+            if self.peek("@"):
+                pending.update(self.annotations())
+            elif self.peek("type"):
+                t = self.type_decl(pending)
+                if t.name in types:
+                    raise CmlParseError(f"type {t.name} declared twice", t.line)
+                types[t.name] = t
+                pending = {}
+            else:
+                self.skip_statement()  # define / property / extern and other global statements
+                pending = {}
+        return types
+
+    def type_decl(self, annotations):
+        line = self.expect("type")[2]
+        name = self.expect(kind="name")[1]
+        parent = None
+        if self.peek(":"):
+            self.advance()
+            parent = self.expect(kind="name")[1]
+        t = CmlType(name, parent, annotations, line)
+        if self.peek(";"):
+            self.advance()
+            return t
+        self.expect("{")
+        pending = {}
+        while not self.peek("}"):
+            if self.current is None:
+                raise CmlParseError(f"type {name} is not closed", line)
+            kind, value, member_line = self.current
+            if value == "@":
+                pending.update(self.annotations())
+                continue
+            if value == "relation":
+                rel = self.relation_decl(pending)
+                t.relations[rel.name] = rel
+            elif value in CONSTRAINT_KEYWORDS or kind != "name":
+                self.skip_statement()
+                t.constraints.append((value, member_line))
+            else:
+                attr = self.attribute_decl(pending)
+                if attr is None:
+                    t.constraints.append((value, member_line))
+                else:
+                    t.attributes[attr.name] = attr
+            pending = {}
+        self.expect("}")
+        if self.peek(";"):
+            self.advance()
+        return t
+
+    def relation_decl(self, annotations):
+        line = self.expect("relation")[2]
+        name = self.expect(kind="name")[1]
+        self.expect(":")
+        target = self.expect(kind="name")[1]
+        cardinality = None
+        if self.peek("["):
+            self.advance()
+            low = self.literal()
+            high = low
+            if self.peek(".."):
+                self.advance()
+                high = self.literal()
+            self.expect("]")
+            # A bound that is not an integer (e.g. the "*" of [0..*]) is kept as written
+            cardinality = tuple(int(b) if b.lstrip("-").isdigit() else b for b in (low, high))
+        if not self.peek(";"):
+            self.skip_statement()  # order (...) and other trailing clauses
+        else:
+            self.advance()
+        return CmlRelation(name, target, cardinality, annotations, line)
+
+    def attribute_decl(self, annotations):
+        # <type>[(scale)] <name> [= [domain] | = <expression>] ;
+        type_name, line = self.current[1], self.current[2]
+        self.advance()
+        if self.peek("("):
+            type_name += "(" + self.skip_group("(", ")") + ")"
+        if self.current is None or self.current[0] != "name":
+            self.skip_statement()  # a call-like rule such as foo(...); not a declaration
+            return None
+        name = self.advance()[1]
+        domain, value_range, expression = (), None, None
+        if self.peek("="):
+            self.advance()
+            if self.peek("["):
+                domain, value_range = self.domain()
+                if not self.peek(";"):
+                    expression = self.skip_statement()
+                    return CmlAttribute(name, type_name, domain, value_range, expression, annotations, line)
+            else:
+                expression = self.skip_statement()
+                return CmlAttribute(name, type_name, domain, value_range, expression, annotations, line)
+        self.expect(";")
+        return CmlAttribute(name, type_name, domain, value_range, expression, annotations, line)
+
+    def skip_group(self, opening, closing):
+        self.expect(opening)
+        depth, text = 1, []
+        while self.current is not None:
+            value = self.advance()[1]
+            if value == opening:
+                depth += 1
+            elif value == closing:
+                depth -= 1
+                if not depth:
+                    return " ".join(text)
+            text.append(value)
+        raise CmlParseError(f"unbalanced {opening}")
+
+    def domain(self):
+        self.expect("[")
+        values = []
+        while not self.peek("]"):
+            values.append(self.literal())
+            if self.peek(".."):
+                self.advance()
+                high = self.literal()
+                self.expect("]")
+                return (), (values[0], high)
+            if self.peek(","):
+                self.advance()
+        self.expect("]")
+        return tuple(values), None
+
+
+def parse_lines(lines, sha256=None, size=None):
+    return CmlModel(_Parser(tokenize(lines)).model(), sha256, size)
+
+
+def parse_text(text):
+    return parse_lines(text.splitlines())
+
+
+# === Parse a blob file, memoised in process and cached on disk by content hash ===
+_models = {}
+_models_lock = threading.Lock()
+
+
+def _cache_path(cache_dir, sha):
+    return os.path.join(cache_dir, f"{sha}.json")
+
+
+def _read_cached(cache_dir, sha):
+    try:
+        with open(_cache_path(cache_dir, sha), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != MODEL_CACHE_VERSION or data.get("sha256") != sha:
+        return None
+    return CmlModel.from_dict(data)
+
+
+def _write_cached(cache_dir, model):
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".model-", dir=cache_dir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(model.to_dict(), f, separators=(",", ":"))
+    os.replace(tmp_path, _cache_path(cache_dir, model.sha256))
+
+
+def load_model(blob_path, cache_dir=MODEL_CACHE_DIR, sha=None):
+    sha = sha or sha256_file(blob_path)
+    with _models_lock:
+        if sha in _models:
+            return _models[sha]
+    model = _read_cached(cache_dir, sha) if cache_dir else None
+    if model is None:
+        with open(blob_path, "rb") as f:
+            model = parse_lines(f, sha, os.path.getsize(blob_path))
+        if cache_dir:
+            _write_cached(cache_dir, model)
+    with _models_lock:
+        _models[sha] = model
+    return model
+
+
+# === CLI: summarise one or more blobs ===
+def main():
+    parser = argparse.ArgumentParser(description="Parse CML blobs (.ffxblob) and print a model summary")
+    parser.add_argument("blobs", nargs="+", help="Blob files to parse")
+    parser.add_argument("--noCache", action="store_true", help="Always parse, ignoring the model cache")
+    args = parser.parse_args()
+
+    failed = False
+    for path in args.blobs:
+        try:
+            model = load_model(path, cache_dir=None if args.noCache else MODEL_CACHE_DIR)
+        except (OSError, CmlParseError) as e:
+            print(f"❌ {path}: {e}")
+            failed = True
+            continue
+        counts = model.summary()
+        print(f"✅ {path}: {counts['types']} types, {counts['relations']} relations, "
+              f"{counts['attributes']} attributes, {counts['constraints']} constraints")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import re
+import time
+import requests
+from collections import namedtuple
+from .sf_session import SalesforceApiError
+from .rate_limit import RETRY_ERROR_CODES, MAX_RETRIES, backoff_delay
+from .run_profile import current_profile
+from .output import echo
+
+GRAPH_MAX_NODES = 500  # Composite Graph limit per graph; each graph commits or rolls back as a unit
+GRAPH_MAX_DEPTH = 15   # longest chain of @{ref.id} references allowed inside one graph
+
+GraphNode = namedtuple("GraphNode", ["ref", "method", "url", "body", "label"])
+# ids: referenceId -> record Id for every node committed so far
+GraphResult = namedtuple("GraphResult", ["success", "ids", "errors", "committed", "total"])
+
+REFERENCE_RE = re.compile(r"@\{(\w+)\.id\}")
+
+
+def _references(value):
+    if isinstance(value, str):
+        return set(REFERENCE_RE.findall(value))
+    if isinstance(value, dict):
+        return set().union(*(_references(v) for v in value.values())) if value else set()
+    return set()
+
+
+def _substitute(value, ids):
+    if isinstance(value, str):
+        return REFERENCE_RE.sub(lambda m: ids.get(m.group(1), m.group(0)), value)
+    if isinstance(value, dict):
+        return {k: _substitute(v, ids) for k, v in value.items()}
+    return value
+
+
+# === Write plan: one node per record operation, linked by @{referenceId.id} ===
+class GraphPlan:
+    def __init__(self, session):
+        self.session = session
+        self.nodes = []
+        self._refs = set()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _path(self, obj_name, record_id=None):
+        # Graph subrequest URLs are relative to the instance
+        return self.session.sobject_url(obj_name, record_id)[len(self.session.instance_url):]
+
+    def _add(self, ref, method, url, body, label):
+        if ref in self._refs:
+            raise ValueError(f"Duplicate graph referenceId: {ref}")
+        missing = (_references(url) | _references(body)) - self._refs
+        if missing:
+            raise ValueError(f"Graph node {ref} references unknown nodes: {sorted(missing)}")
+        self._refs.add(ref)
+        self.nodes.append(GraphNode(ref, method, url, body, label or ref))
+        return "@{%s.id}" % ref
+
+    def create(self, ref, obj_name, record, label=None):
+        return self._add(ref, "POST", self._path(obj_name), record, label)
+
+    def update(self, ref, obj_name, record_id, record, label=None):
+        return self._add(ref, "PATCH", self._path(obj_name, record_id), record, label)
+
+    def delete(self, ref, obj_name, record_id, label=None):
+        return self._add(ref, "DELETE", self._path(obj_name, record_id), None, label)
+
+    # --- splitting ---
+    def graphs(self, max_nodes=GRAPH_MAX_NODES):
+        # Nodes were added in dependency order (a node may only reference earlier ones), so
+        # consecutive slices keep that order; references into an earlier graph are resolved
+        # from its committed Ids before the next graph is sent.
+        depth = {}
+        for node in self.nodes:
+            parents = _references(node.url) | _references(node.body)
+            depth[node.ref] = 1 + max((depth[p] for p in parents), default=0)
+            if depth[node.ref] > GRAPH_MAX_DEPTH:
+                raise ValueError(f"Graph node {node.ref} is nested deeper than {GRAPH_MAX_DEPTH} levels")
+        return [self.nodes[start:start + max_nodes] for start in range(0, len(self.nodes), max_nodes)]
+
+
+def _node_errors(node, sub):
+    if sub.get("httpStatusCode", 0) < 400:
+        return []
+    body = sub.get("body")
+    errors = body if isinstance(body, list) else [{"errorCode": f"HTTP_{sub.get('httpStatusCode')}", "message": str(body)}]
+    # Nodes rolled back because of another node's failure only say PROCESSING_HALTED
+    return [dict(e, node=node.label) for e in errors if e.get("errorCode") != "PROCESSING_HALTED"]
+
+
+def _send_graph(session, graph_id, nodes, ids):
+    payload = {"graphs": [{
+        "graphId": graph_id,
+        "compositeRequest": [
+            dict({"method": n.method, "url": _substitute(n.url, ids), "referenceId": n.ref},
+                 **({"body": _substitute(n.body, ids)} if n.body is not None else {}))
+            for n in nodes
+        ]
+    }]}
+    resp = session.post(f"{session.base_url}/composite/graph", json=payload)
+    if resp.status_code != 200:
+        raise SalesforceApiError(f"Composite Graph request failed: {resp.status_code} - {resp.text}", resp.status_code, resp.text)
+    graph = resp.json()["graphs"][0]
+    by_ref = {n.ref: n for n in nodes}
+    responses = graph.get("graphResponse", {}).get("compositeResponse", [])
+    if not graph.get("isSuccessful"):
+        errors = [e for sub in responses if sub.get("referenceId") in by_ref
+                  for e in _node_errors(by_ref[sub["referenceId"]], sub)]
+        return False, {}, errors or [{"errorCode": "GRAPH_FAILED", "message": str(graph)}]
+    created = {sub["referenceId"]: sub["body"]["id"] for sub in responses
+               if isinstance(sub.get("body"), dict) and sub["body"].get("id")}
+    return True, created, []
+
+
+# Target Id a committed node wrote: returned by a create, part of the URL otherwise
+def node_record_id(node, ids):
+    if node.method == "POST":
+        return ids.get(node.ref)
+    return _substitute(node.url, ids).rstrip("/").rsplit("/", 1)[-1]
+
+
+# A graph rolled back only by row locks / limits wrote nothing and can be resubmitted as is
+def _transient(errors):
+    return bool(errors) and all(e.get("errorCode") in RETRY_ERROR_CODES for e in errors)
+
+
+def _send_graph_with_retry(session, graph_id, nodes, ids, max_retries=MAX_RETRIES):
+    for attempt in range(max_retries + 1):
+        ok, created, errors = _send_graph(session, graph_id, nodes, ids)
+        if ok or attempt == max_retries or not _transient(errors):
+            return ok, created, errors
+        delay = backoff_delay(attempt)
+        current_profile().record_retry("POST", f"{session.base_url}/composite/graph")
+        codes = ", ".join(sorted({e["errorCode"] for e in errors}))
+        echo(f"⏳ Graph {graph_id} rolled back ({codes}), retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+        time.sleep(delay)
+
+
+# === Submit graphs in order; stop at the first one that rolls back for good ===
+# on_graph(nodes, ids) runs after each committed graph, e.g. to journal progress.
+def submit_plan(session, plan, max_nodes=GRAPH_MAX_NODES, on_graph=None):
+    graphs = plan.graphs(max_nodes)
+    ids = {}
+    for number, nodes in enumerate(graphs, start=1):
+        try:
+            ok, created, errors = _send_graph_with_retry(session, f"g{number}", nodes, ids)
+        except SalesforceApiError as e:
+            # Graphs already committed stay committed; report this one like a rollback
+            ok, created, errors = False, {}, [{"node": f"graph g{number}", "errorCode": f"HTTP_{e.status_code}",
+                                               "message": str(e.body or e)}]
+        except (requests.RequestException, ValueError) as e:
+            ok, created, errors = False, {}, [{"node": f"graph g{number}", "errorCode": type(e).__name__, "message": str(e)}]
+        if not ok:
+            return GraphResult(False, ids, errors, number - 1, len(graphs))
+        ids.update(created)
+        if on_graph:
+            on_graph(nodes, ids)
+    return GraphResult(True, ids, [], len(graphs), len(graphs))
@@ -0,0 +1,52 @@
+from collections import namedtuple, defaultdict
+
+# Fields that make up an ExpressionSetConstraintObj's content within one ExpressionSet
+SYNC_FIELDS = ("ReferenceObjectId", "ConstraintModelTag", "ConstraintModelTagType")
+
+# inserts/updates: [(CSV line, record)], deletes: [Id], unchanged: count
+SyncPlan = namedtuple("SyncPlan", ["inserts", "updates", "deletes", "unchanged"])
+
+
+def full_key(rec):
+    return tuple(rec.get(f) or "" for f in SYNC_FIELDS)
+
+
+def tag_key(rec):
+    return (rec.get("ConstraintModelTag") or "", rec.get("ConstraintModelTagType") or "")
+
+
+# === Minimal delta between the target's records and the resolved import rows ===
+def plan_sync(existing, desired):
+    # Pass 1: identical records are left alone (multiset match, duplicates allowed)
+    by_full = defaultdict(list)
+    for rec in existing:
+        by_full[full_key(rec)].append(rec)
+
+    unchanged = 0
+    unmatched = []
+    for csv_line, rec in desired:
+        bucket = by_full.get(full_key(rec))
+        if bucket:
+            bucket.pop()
+            unchanged += 1
+        else:
+            unmatched.append((csv_line, rec))
+
+    # Pass 2: same tag now pointing at a different record -> update in place
+    by_tag = defaultdict(list)
+    for bucket in by_full.values():
+        for rec in bucket:
+            by_tag[tag_key(rec)].append(rec)
+
+    inserts, updates = [], []
+    for csv_line, rec in unmatched:
+        bucket = by_tag.get(tag_key(rec))
+        if bucket:
+            old = bucket.pop()
+            updates.append((csv_line, {"Id": old["Id"], "ReferenceObjectId": rec["ReferenceObjectId"]}))
+        else:
+            inserts.append((csv_line, rec))
+
+    # Whatever is left in the target no longer exists in the import
+    deletes = [rec["Id"] for bucket in by_tag.values() for rec in bucket]
+    return SyncPlan(inserts, updates, deletes, unchanged)
@@ -0,0 +1,235 @@
+import io
+import os
+import sys
+import csv
+import json
+import time
+import shutil
+import hashlib
+import zipfile
+import argparse
+import threading
+from .blob_store import sha256_file, CHUNK_SIZE
+from .import_journal import dataset_key
+
+BUNDLE_SUFFIX = ".cmlbundle"
+BUNDLE_FORMAT = "cml-bundle"
+BUNDLE_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+# Blobs are extracted from bundles on first use, once per content hash
+BLOB_CACHE_DIR = os.environ.get(
+    "CML_BLOB_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cml_migration", "blobs")
+)
+TABLES = (
+    "ExpressionSetDefinitionVersion", "ExpressionSetDefinitionContextDefinition", "ExpressionSet",
+    "ExpressionSetConstraintObj", "Product2", "ProductClassification", "ProductRelatedComponent",
+)
+
+
+def is_bundle(path):
+    return os.path.isfile(path) and path.endswith(BUNDLE_SUFFIX)
+
+
+# Content address of an export: the same tables and blobs always give the same id
+def bundle_id(tables, blobs):
+    canonical = {"tables": {name: t["sha256"] for name, t in tables.items()},
+                 "blobs": {name: b["sha256"] for name, b in blobs.items()}}
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _column_member(table, column):
+    return f"tables/{table}/{column}.csv"
+
+
+# === Pack: one zip, one single-column CSV member per table column ===
+# Column members compress better than whole rows and let a reader open only the columns it needs.
+def write_bundle(data_dir, bundle_path):
+    tables, blobs = {}, {}
+    tmp_path = bundle_path + ".part"
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
+        for table in TABLES:
+            csv_path = os.path.join(data_dir, f"{table}.csv")
+            if not os.path.exists(csv_path):
+                continue
+            with open(csv_path, newline="", encoding="utf-8") as f:
+                header = next(csv.reader(f), [])
+            rows = 0
+            for col, column in enumerate(header):
+                # One pass over the CSV per column keeps memory flat for any table size
+                with open(csv_path, newline="", encoding="utf-8") as src, \
+                        zf.open(_column_member(table, column), "w", force_zip64=True) as raw:
+                    out = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+                    writer = csv.writer(out)
+                    reader = csv.reader(src)
+                    next(reader)
+                    rows = 0
+                    for row in reader:
+                        if row:
+                            writer.writerow((row[col],))
+                            rows += 1
+                    out.flush()
+                    out.detach()
+            tables[table] = {"columns": header, "rows": rows, "sha256": sha256_file(csv_path)}
+
+        blob_dir = os.path.join(data_dir, "blobs")
+        for name in sorted(os.listdir(blob_dir)) if os.path.isdir(blob_dir) else ():
+            if name.endswith(".ffxblob"):
+                path = os.path.join(blob_dir, name)
+                zf.write(path, f"blobs/{name}")
+                blobs[name] = {"sha256": sha256_file(path), "size": os.path.getsize(path)}
+
+        manifest = {
+            "format": BUNDLE_FORMAT, "version": BUNDLE_VERSION, "id": bundle_id(tables, blobs),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "tables": tables, "blobs": blobs,
+        }
+        zf.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+    os.replace(tmp_path, bundle_path)
+    return manifest
+
+
+# === Read side: the importer reads a folder and a bundle through the same interface ===
+class ExportFolder:
+    def __init__(self, data_dir):
+        self.path = data_dir
+        self.journal_dir = data_dir
+
+    def close(self):
+        pass  # nothing held open between reads
+
+    def rows(self, table, columns=None):
+        # Streams dicts holding only `columns` (all of them when None)
+        with open(os.path.join(self.path, f"{table}.csv"), newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            names = [name for name in columns if name in header] if columns else header
+            picked = [(name, header.index(name)) for name in names]
+            for row in reader:
+                if row:
+                    yield {name: row[i] for name, i in picked}
+
+    def blob_file(self, name):
+        path = os.path.join(self.path, "blobs", name)
+        return path if os.path.exists(path) else None
+
+    def blob_sha256(self, name):
+        return None  # hashed from the file when needed
+
+    def dataset_key(self, blob_name):
+        # A journal only resumes the run for the exact same CSVs and blob
+        return dataset_key([os.path.join(self.path, f"{table}.csv") for table in TABLES] +
+                           [os.path.join(self.path, "blobs", blob_name)])
+
+
+class ExportBundle:
+    def __init__(self, bundle_path, blob_cache_dir=BLOB_CACHE_DIR):
+        self.path = bundle_path
+        self.journal_dir = os.path.dirname(os.path.abspath(bundle_path))
+        self.blob_cache_dir = blob_cache_dir
+        self._zip = zipfile.ZipFile(bundle_path)
+        self._lock = threading.Lock()  # ZipFile reads share one file handle
+        self.manifest = json.loads(self._zip.read(MANIFEST_NAME))
+        if self.manifest.get("format") != BUNDLE_FORMAT or self.manifest.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"{bundle_path} is not a version {BUNDLE_VERSION} {BUNDLE_FORMAT}")
+        if bundle_id(self.manifest["tables"], self.manifest["blobs"]) != self.manifest["id"]:
+            raise ValueError(f"{bundle_path}: manifest does not match its content id")
+        self.id = self.manifest["id"]
+
+    def close(self):
+        self._zip.close()
+
+    def rows(self, table, columns=None):
+        # Decompresses only the requested column members and zips them back into rows
+        header = self.manifest["tables"][table]["columns"]
+        names = [name for name in columns if name in header] if columns else header
+        with self._lock:
+            members = [self._zip.open(_column_member(table, name)) for name in names]
+        try:
+            readers = [csv.reader(io.TextIOWrapper(m, encoding="utf-8", newline="")) for m in members]
+            for values in zip(*readers):
+                yield {name: value[0] for name, value in zip(names, values)}
+        finally:
+            for m in members:
+                m.close()
+
+    def blob_sha256(self, name):
+        blob = self.manifest["blobs"].get(name)
+        return blob and blob["sha256"]
+
+    def blob_file(self, name):
+        # Extracted into a content-addressed cache, so every bundle holding the same blob shares one copy
+        blob = self.manifest["blobs"].get(name)
+        if not blob:
+            return None
+        path = os.path.join(self.blob_cache_dir, f"{blob['sha256']}.ffxblob")
+        if os.path.exists(path) and os.path.getsize(path) == blob["size"]:
+            return path
+        os.makedirs(self.blob_cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        with self._lock, self._zip.open(f"blobs/{name}") as src, open(tmp_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        if sha256_file(tmp_path) != blob["sha256"]:
+            os.remove(tmp_path)
+            raise ValueError(f"{self.path}: blob {name} does not match its manifest hash")
+        os.replace(tmp_path, path)
+        return path
+
+    def dataset_key(self, blob_name):
+        return self.id  # already a hash of every table and blob
+
+
+def open_export(path):
+    return ExportBundle(path) if is_bundle(path) else ExportFolder(path)
+
+
+# === CLI: pack / inspect / unpack ===
+def unpack_bundle(bundle, out_dir):
+    os.makedirs(os.path.join(out_dir, "blobs"), exist_ok=True)
+    for table, info in bundle.manifest["tables"].items():
+        with open(os.path.join(out_dir, f"{table}.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=info["columns"])
+            writer.writeheader()
+            writer.writerows(bundle.rows(table))
+    for name in bundle.manifest["blobs"]:
+        shutil.copyfile(bundle.blob_file(name), os.path.join(out_dir, "blobs", name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack an export folder into a single .cmlbundle file, or inspect/unpack one")
+    sub = parser.add_subparsers(dest="command", required=True)
+    pack = sub.add_parser("pack", help="Pack export folder(s); each becomes <folder>.cmlbundle unless --output is given")
+    pack.add_argument("dataDirs", nargs="+")
+    pack.add_argument("--output", type=str, help="Bundle path (single folder only)")
+    info = sub.add_parser("info", help="Print a bundle's manifest summary")
+    info.add_argument("bundles", nargs="+")
+    unpack = sub.add_parser("unpack", help="Restore the CSVs and blobs of a bundle into a folder")
+    unpack.add_argument("bundle")
+    unpack.add_argument("outputDir")
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        if args.output and len(args.dataDirs) > 1:
+            parser.error("--output only works with a single folder")
+        for data_dir in args.dataDirs:
+            bundle_path = args.output or data_dir.rstrip("/\\") + BUNDLE_SUFFIX
+            manifest = write_bundle(data_dir, bundle_path)
+            print(f"📦 {data_dir} → {bundle_path} ({os.path.getsize(bundle_path):,} bytes, id {manifest['id'][:12]})")
+    elif args.command == "info":
+        for path in args.bundles:
+            try:
+                bundle = ExportBundle(path)
+            except (OSError, ValueError, zipfile.BadZipFile) as e:
+                print(f"❌ {path}: {e}")
+                sys.exit(1)
+            print(f"📦 {path}: id {bundle.id[:12]}, created {bundle.manifest['created']}")
+            for table, t in bundle.manifest["tables"].items():
+                print(f"    {table}: {t['rows']} rows × {len(t['columns'])} columns")
+            for name, b in bundle.manifest["blobs"].items():
+                print(f"    blobs/{name}: {b['size']:,} bytes")
+    else:
+        unpack_bundle(ExportBundle(args.bundle), args.outputDir)
+        print(f"📂 {args.bundle} → {args.outputDir}")
+
+
+if __name__ == "__main__":
+    main()
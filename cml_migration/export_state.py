@@ -0,0 +1,61 @@
+import os
+import csv
+import json
+from datetime import timedelta
+from email.utils import parsedate_to_datetime
+
+STATE_NAME = ".export_state.json"
+STATE_VERSION = 1
+# Each delta re-reads this much before the previous run started: SystemModstamp is set when a
+# transaction starts, so a record committed during the last export can carry an older stamp.
+DELTA_OVERLAP = int(os.environ.get("CML_DELTA_OVERLAP", "300"))  # seconds
+
+
+# === Per output folder: object -> {"watermark": ..., "scope": ...} ===
+def load_state(out_dir):
+    try:
+        with open(os.path.join(out_dir, STATE_NAME), encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {"version": STATE_VERSION, "objects": {}}
+    if state.get("version") != STATE_VERSION:
+        return {"version": STATE_VERSION, "objects": {}}
+    return state
+
+
+def save_state(out_dir, state):
+    path = os.path.join(out_dir, STATE_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+# Watermark for the run about to start, taken from the org's clock rather than ours
+def next_watermark(session, overlap=DELTA_OVERLAP):
+    resp = session.get(f"{session.base_url}/")
+    server_time = parsedate_to_datetime(resp.headers["Date"])
+    return (server_time - timedelta(seconds=overlap)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+# === Id-keyed CSV rows for merging ===
+def read_rows_by_id(filename):
+    # (header, {Id: row}) in file order, or None when there is nothing to merge into
+    if not os.path.exists(filename):
+        return None
+    with open(filename, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header or "Id" not in header:
+            return None
+        id_col = header.index("Id")
+        return header, {row[id_col]: row for row in reader if row}
+
+
+def write_rows(filename, header, rows):
+    tmp_filename = filename + ".part"
+    with open(tmp_filename, mode="w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    os.replace(tmp_filename, filename)
@@ -0,0 +1,600 @@
+import io
+import csv
+import os
+import sys
+import re
+import fnmatch
+import contextvars
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from .sf_session import get_org_session, scheduler_stats, SalesforceApiError
+from .soql import build_in_queries, iter_queries, quote, datetime_literal
+from .blob_store import is_blob_current, stream_to_file, write_manifest
+from .sf_bulk import run_query_job, stream_query_results
+from .export_state import load_state, save_state, next_watermark, read_rows_by_id, write_rows
+from .export_bundle import ExportFolder, write_bundle, BUNDLE_SUFFIX
+from .uk_index import REFERENCE_PREFIXES, reference_ids_by_prefix
+from .run_profile import PROFILE, phase, profiled
+from .output import echo
+
+SOURCE_ALIAS = "vpdevpro"
+DATA_DIR = "data"
+SHARED_DIR_NAME = "_shared"
+DEFAULT_WORKERS = 4
+BULK_EXPORT_THRESHOLD = 50000  # rows; "auto" switches to a Bulk API 2.0 query job above this
+ENGINES = ("auto", "rest", "bulk")
+
+PRODUCT_FIELDS = ["Id", "Name"]
+CLASSIFICATION_FIELDS = ["Id", "Name"]
+PRC_FIELDS = [
+    "Id", "Name",
+    "ParentProductId", "ParentProduct.Name",
+    "ChildProductId", "ChildProduct.Name",
+    "ChildProductClassificationId", "ChildProductClassification.Name",
+    "ProductRelationshipTypeId", "ProductRelationshipType.Name","Sequence"
+]
+PRC_SELECT = """
+    SELECT Id, Name,
+           ParentProductId, ParentProduct.Name,
+           ChildProductId, ChildProduct.Name,
+           ChildProductClassificationId, ChildProductClassification.Name,
+           ProductRelationshipTypeId, ProductRelationshipType.Name, Sequence
+    FROM ProductRelatedComponent
+"""
+PRC_QUERY = PRC_SELECT + "    WHERE Id IN ({values})\n"
+ESC_FIELDS = ["Name", "ExpressionSetId", "ExpressionSet.ApiName", "ReferenceObjectId", "ConstraintModelTag", "ConstraintModelTagType", "Id"]
+# PRC rows embed these objects' names, so renaming one of them changes the PRC row without touching its SystemModstamp
+PRC_DEPENDENCIES = {
+    "ParentProductId": "Product2", "ChildProductId": "Product2",
+    "ChildProductClassificationId": "ProductClassification", "ProductRelationshipTypeId": "ProductRelationshipType",
+}
+
+class ExportError(Exception):
+    # A CSV or blob of one set could not be exported (the cause was already reported)
+    pass
+
+# === Nested child reader helper ===
+def get_field_value(rec, field):
+    if "." in field:
+        parent, child = field.split(".", 1)
+        parent_obj = rec.get(parent)
+        if parent_obj and isinstance(parent_obj, dict):
+            return parent_obj.get(child, "")
+        return ""
+    return rec.get(field, "")
+
+# === Row count for the engine decision ===
+def count_rows(session, soql):
+    count_soql = re.sub(r"^\s*SELECT\s+.*?\s+FROM\s+", "SELECT COUNT() FROM ", soql, count=1, flags=re.IGNORECASE | re.DOTALL)
+    resp = session.get(session.query_url, params={"q": count_soql})
+    if resp.status_code != 200:
+        raise SalesforceApiError(f"Count failed: {resp.status_code} - {resp.text}", resp.status_code, resp.text)
+    return resp.json().get("totalSize", 0)
+
+def choose_engine(session, queries, engine):
+    # Chunked Id lists are bounded per chunk, so only single queries are worth counting
+    if engine != "auto":
+        return engine
+    if len(queries) != 1:
+        return "rest"
+    rows = count_rows(session, queries[0])
+    return "bulk" if rows > BULK_EXPORT_THRESHOLD else "rest"
+
+def write_rest_csv(session, queries, tmp_filename, fields):
+    count = 0
+    with open(tmp_filename, mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(fields)
+        for rec in iter_queries(session, queries, prefetch=True):
+            writer.writerow([get_field_value(rec, f) for f in fields])
+            count += 1
+    return count
+
+def write_bulk_csv(session, queries, tmp_filename, fields):
+    # Result pages are copied to disk as-is; only the header is replaced by our field list
+    count = 0
+    with open(tmp_filename, mode="wb") as file:
+        header = io.StringIO()
+        csv.writer(header, lineterminator="\n").writerow(fields)
+        file.write(header.getvalue().encode("utf-8"))
+        for soql in queries:
+            job_id = run_query_job(session, soql)
+            count += stream_query_results(session, job_id, file, len(fields))
+    return count
+
+# === Export CSV Helper ===
+@profiled(lambda a: f"export {os.path.splitext(os.path.basename(a['filename']))[0]}")
+def export_to_csv(query, filename, fields, alias=SOURCE_ALIAS, engine="auto"):
+    # query may be a single SOQL string or a list of chunked queries whose results are merged
+    queries = [query] if isinstance(query, str) else list(query)
+    echo(f"📦 Exporting: {filename.replace('data/', '')}")
+    if not queries:
+        echo("🔍 Nothing referenced, writing header only")
+    elif len(queries) == 1:
+        echo("🔍 SOQL Query:", queries[0].strip())
+    else:
+        echo(f"🔍 SOQL Query ({len(queries)} chunks):", " ".join(queries[0].split())[:200], "...")
+
+    try:
+        session = get_org_session(alias)
+    except Exception as e:
+        echo("❌ Failed to retrieve org info from Salesforce CLI.")
+        echo(e)
+        return
+
+    # Stream every page straight into the CSV; write to a temp file so a failed
+    # export never leaves a truncated CSV behind under the real name.
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    tmp_filename = filename + ".part"
+    try:
+        if queries and choose_engine(session, queries, engine) == "bulk":
+            echo("🚚 Using Bulk API 2.0 query engine")
+            count = write_bulk_csv(session, queries, tmp_filename, fields)
+        else:
+            count = write_rest_csv(session, queries, tmp_filename, fields)
+    except SalesforceApiError as e:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        echo(f"❌ API Error ({filename}): {e.status_code}")
+        echo(e.body if e.body is not None else e)
+        return
+    os.replace(tmp_filename, filename)
+
+    echo(f"✅ {count} records fetched for {filename}")
+    echo(f"📄 Saved to {filename}\n")
+    return count
+
+def export_required(query, filename, fields, alias=SOURCE_ALIAS, engine="auto"):
+    # export_to_csv reports its own errors and returns None; a stale CSV must never stand in for a failed one
+    count = export_to_csv(query, filename, fields, alias, engine)
+    if count is None:
+        raise ExportError(f"export of {os.path.basename(filename)} failed")
+    return count
+
+
+# === Blob Download Helper ===
+@profiled("blob download")
+def download_constraint_model_blobs(dev_name, version_num, out_dir=DATA_DIR, alias=SOURCE_ALIAS):
+    echo("📥 Downloading ConstraintModel blobs...")
+    api_name_versioned = f"{dev_name}_V{version_num}"
+    input_csv = os.path.join(out_dir, "ExpressionSetDefinitionVersion.csv")
+
+    try:
+        session = get_org_session(alias)
+    except Exception as e:
+        echo("❌ Failed to get org info")
+        echo(e)
+        return None
+
+    blob_dir = os.path.join(out_dir, "blobs")
+    os.makedirs(blob_dir, exist_ok=True)
+    saved = 0
+
+    with open(input_csv, newline='') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            echo(f"🧪 Row: DeveloperName={row.get('DeveloperName')}, Version={row.get('VersionNumber')}")
+
+            if row.get("DeveloperName") != api_name_versioned:
+                echo("⏭️ Skipped (not matching filter)")
+                continue
+
+            blob_url = row.get("ConstraintModel", "")
+            if not blob_url.startswith("/services"):
+                echo(f"⚠️ Invalid or empty blob URL: {blob_url}")
+                continue
+
+            file_path = os.path.join(blob_dir, f"ESDV_{dev_name}_V{version_num}.ffxblob")
+            version_stamp = row.get("SystemModstamp") or row.get("LastModifiedDate")
+            if is_blob_current(file_path, version_stamp):
+                echo(f"⏭️ Blob unchanged since {version_stamp}, keeping {file_path}")
+                saved += 1
+                continue
+
+            full_url = session.instance_url + blob_url
+            echo(f"🌐 Fetching blob from: {full_url}")
+
+            resp = session.get(full_url, stream=True)
+            if resp.status_code == 200:
+                sha256, size = stream_to_file(resp, file_path)
+                write_manifest(file_path, sha256=sha256, size=size, record_id=row.get("Id"),
+                               source_url=blob_url, version_stamp=version_stamp)
+                echo(f"✅ Saved blob: {file_path} ({size} bytes, sha256 {sha256[:12]}…)")
+                saved += 1
+            else:
+                echo(f"❌ Failed to fetch blob: {resp.status_code} - {resp.text}")
+                return None
+    return saved
+
+# === Filtering Helper ===
+def referenced_ids(out_dir):
+    # One streaming pass over the ESC CSV, reading only ReferenceObjectId
+    try:
+        return reference_ids_by_prefix(ExportFolder(out_dir).rows("ExpressionSetConstraintObj", ("ReferenceObjectId",)))
+    except (OSError, csv.Error) as e:
+        echo(f"❌ Could not read the ReferenceObjectIds of {out_dir}: {e}")
+        raise ExportError(f"ReferenceObjectIds of {out_dir} unreadable: {e}") from e
+
+def build_id_query(obj_name, ids):
+    # One query per size-bounded IN chunk; no ids means no queries (header-only CSV)
+    return build_in_queries(f"SELECT Id, Name FROM {obj_name} WHERE Id IN ({{values}})", ids)
+
+def supporting_queries(obj_name, ids):
+    if obj_name == "ProductRelatedComponent":
+        return build_in_queries(PRC_QUERY, ids)
+    return build_id_query(obj_name, ids)
+
+def esc_query(dev_name):
+    return f"""
+            SELECT {", ".join(ESC_FIELDS)}
+            FROM ExpressionSetConstraintObj
+            WHERE ExpressionSet.ApiName = '{dev_name}'
+        """
+
+
+# === Incremental export helpers ===
+def deleted_ids(session, obj_name, since):
+    soql = f"SELECT Id FROM {obj_name} WHERE IsDeleted = true AND SystemModstamp >= {datetime_literal(since)}"
+    return {r["Id"] for r in session.iter_query(soql, include_deleted=True)}
+
+def merge_csv(filename, header, existing, records, removed_ids, fields):
+    # Changed rows replace their Id in place, new ones are appended, removed Ids drop out
+    rows = dict(existing)
+    added = updated = 0
+    for rec in records:
+        if rec["Id"] in rows:
+            updated += 1
+        else:
+            added += 1
+        rows[rec["Id"]] = [get_field_value(rec, f) for f in fields]
+    removed = sum(1 for rid in removed_ids if rows.pop(rid, None) is not None)
+    write_rows(filename, header, rows.values())
+    echo(f"🔄 {os.path.basename(filename)}: {added} new, {updated} changed, {removed} removed ({len(rows)} rows)\n")
+    return len(rows)
+
+@profiled("export ExpressionSetConstraintObj (incremental)")
+def export_esc_incremental(dev_name, filename, out_dir, alias=SOURCE_ALIAS, engine="auto"):
+    session = get_org_session(alias)
+    state = load_state(out_dir)
+    entry = state["objects"].get("ExpressionSetConstraintObj")
+    existing = read_rows_by_id(filename)
+    watermark = next_watermark(session)
+    try:
+        if not entry or entry.get("scope") != dev_name or not existing or existing[0] != ESC_FIELDS:
+            echo("🆕 No watermark for ExpressionSetConstraintObj yet, exporting in full")
+            count = export_to_csv(esc_query(dev_name), filename, ESC_FIELDS, alias, engine)
+            if count is None:
+                return None
+        else:
+            since = entry["watermark"]
+            echo(f"📦 Exporting changes since {since}: {os.path.basename(filename)}")
+            changed = session.query(esc_query(dev_name) + f" AND SystemModstamp >= {datetime_literal(since)}")
+            count = merge_csv(filename, existing[0], existing[1], changed,
+                              deleted_ids(session, "ExpressionSetConstraintObj", since), ESC_FIELDS)
+    except SalesforceApiError as e:
+        echo(f"❌ API Error ({filename}): {e.status_code}")
+        echo(e.body if e.body is not None else e)
+        return None
+    state["objects"]["ExpressionSetConstraintObj"] = {"watermark": watermark, "scope": dev_name}
+    save_state(out_dir, state)
+    return count
+
+@profiled("export supporting objects (incremental)")
+def export_supporting_incremental(refs, out_dir=DATA_DIR, alias=SOURCE_ALIAS, engine="auto"):
+    session = get_org_session(alias)
+    state = load_state(out_dir)
+    watermark = next_watermark(session)
+    changed_ids = {}  # object -> every Id changed since its watermark, org-wide
+    exported_in_full = set()
+    try:
+        for obj_name, prefix, fields, csv_name in (
+            ("Product2", "01t", PRODUCT_FIELDS, "Product2.csv"),
+            ("ProductClassification", "11B", CLASSIFICATION_FIELDS, "ProductClassification.csv"),
+            ("ProductRelatedComponent", "0dS", PRC_FIELDS, "ProductRelatedComponent.csv"),
+        ):
+            filename = os.path.join(out_dir, csv_name)
+            entry = state["objects"].get(obj_name)
+            existing = read_rows_by_id(filename)
+            wanted = set(refs[prefix])
+            renamed_deps = obj_name == "ProductRelatedComponent" and exported_in_full & set(PRC_DEPENDENCIES.values())
+            if not entry or not existing or existing[0] != fields or renamed_deps:
+                echo(f"🆕 No watermark for {obj_name} yet, exporting in full")
+                if export_to_csv(supporting_queries(obj_name, refs[prefix]), filename, fields, alias, engine) is None:
+                    return None
+                exported_in_full.add(obj_name)
+            else:
+                since = entry["watermark"]
+                echo(f"📦 Exporting changes since {since}: {csv_name}")
+                select = PRC_SELECT if obj_name == "ProductRelatedComponent" else f"SELECT Id, Name FROM {obj_name}"
+                delta = session.query(f"{select} WHERE SystemModstamp >= {datetime_literal(since)}")
+                changed_ids[obj_name] = {r["Id"] for r in delta}
+                records = [r for r in delta if r["Id"] in wanted]
+                refetch = wanted - existing[1].keys()
+                if obj_name == "ProductRelatedComponent":
+                    changed_ids["ProductRelationshipType"] = {r["Id"] for r in session.iter_query(
+                        f"SELECT Id FROM ProductRelationshipType WHERE SystemModstamp >= {datetime_literal(since)}")}
+                    columns = {col: existing[0].index(col) for col in PRC_DEPENDENCIES}
+                    refetch |= {rid for rid, row in existing[1].items() if rid in wanted and any(
+                        row[i] in changed_ids.get(PRC_DEPENDENCIES[col], ()) for col, i in columns.items())}
+                refetch -= changed_ids[obj_name]
+                records += list(iter_queries(session, supporting_queries(obj_name, refetch)))
+                removed = (existing[1].keys() - wanted) | deleted_ids(session, obj_name, since)
+                merge_csv(filename, existing[0], existing[1], records, removed, fields)
+            state["objects"][obj_name] = {"watermark": watermark}
+    except SalesforceApiError as e:
+        echo(f"❌ API Error (incremental export): {e.status_code}")
+        echo(e.body if e.body is not None else e)
+        return None
+    save_state(out_dir, state)
+    return watermark
+
+
+# === Expression Set export (definition, version, set, constraint objects, blob) ===
+@profiled(lambda a: f"expression set {a['dev_name']}")
+def export_expression_set(dev_name, version_num, out_dir=DATA_DIR, alias=SOURCE_ALIAS, engine="auto", incremental=False):
+    export_required(
+        query=f"""
+            SELECT ConstraintModel, DeveloperName, ExpressionSetDefinition.DeveloperName, ExpressionSetDefinitionId, Id, Language,
+                   MasterLabel, Status, VersionNumber, LastModifiedDate, SystemModstamp
+            FROM ExpressionSetDefinitionVersion
+            WHERE ExpressionSetDefinition.DeveloperName = '{dev_name}'
+              AND VersionNumber = {version_num}
+        """,
+        filename=os.path.join(out_dir, "ExpressionSetDefinitionVersion.csv"),
+        fields=[
+            "ConstraintModel", "DeveloperName", "ExpressionSetDefinition.DeveloperName", "ExpressionSetDefinitionId", "Id", "Language",
+            "MasterLabel", "Status", "VersionNumber", "LastModifiedDate", "SystemModstamp"
+        ],
+        alias=alias,
+        engine="rest"  # single-row; ConstraintModel (base64) is not Bulk-queryable
+    )
+
+    export_required(
+        query=f"""
+            SELECT ContextDefinitionApiName, ContextDefinitionId, ExpressionSetApiName, ExpressionSetDefinitionId
+            FROM ExpressionSetDefinitionContextDefinition
+            WHERE ExpressionSetDefinition.DeveloperName = '{dev_name}'
+        """,
+        filename=os.path.join(out_dir, "ExpressionSetDefinitionContextDefinition.csv"),
+        fields=[
+            "ContextDefinitionApiName", "ContextDefinitionId", "ExpressionSetApiName", "ExpressionSetDefinitionId"
+        ],
+        alias=alias,
+        engine="rest"  # single row; a Bulk job costs more calls than it saves
+    )
+
+    export_required(
+        query=f"""
+            SELECT ApiName, Description, ExpressionSetDefinitionId, Id,
+                   InterfaceSourceType, Name, ResourceInitializationType, UsageType
+            FROM ExpressionSet
+            WHERE ExpressionSetDefinition.DeveloperName = '{dev_name}'
+        """,
+        filename=os.path.join(out_dir, "ExpressionSet.csv"),
+        fields=[
+            "ApiName", "Description", "ExpressionSetDefinitionId", "Id",
+            "InterfaceSourceType", "Name", "ResourceInitializationType", "UsageType"
+        ],
+        alias=alias,
+        engine="rest"  # single row; a Bulk job costs more calls than it saves
+    )
+
+    esc_csv = os.path.join(out_dir, "ExpressionSetConstraintObj.csv")
+    if incremental:
+        if export_esc_incremental(dev_name, esc_csv, out_dir, alias, engine) is None:
+            raise ExportError(f"incremental export of {os.path.basename(esc_csv)} failed")
+    else:
+        export_required(
+            query=esc_query(dev_name),
+            filename=esc_csv,
+            fields=ESC_FIELDS,
+            alias=alias,
+            engine=engine
+        )
+
+    if download_constraint_model_blobs(dev_name, version_num, out_dir, alias) is None:
+        raise ExportError(f"ConstraintModel blob of {dev_name} V{version_num} failed")
+
+    # === Pull only referenced Product2, ProductClassification, and ProductRelatedComponent ===
+    echo("🔍 Filtering ReferenceObjectIds...")
+    return referenced_ids(out_dir)
+
+
+# === Supporting Objects ===
+@profiled("supporting objects")
+def export_supporting_objects(refs, out_dir=DATA_DIR, alias=SOURCE_ALIAS, engine="auto", incremental=False):
+    if incremental:
+        if export_supporting_incremental(refs, out_dir, alias, engine) is None:
+            raise ExportError("incremental export of the supporting objects failed")
+        return
+
+    # Export referenced Product2
+    export_required(
+        query=build_id_query("Product2", refs["01t"]),
+        filename=os.path.join(out_dir, "Product2.csv"),
+        fields=PRODUCT_FIELDS,
+        alias=alias,
+        engine=engine
+    )
+
+    # Export referenced ProductClassification
+    export_required(
+        query=build_id_query("ProductClassification", refs["11B"]),
+        filename=os.path.join(out_dir, "ProductClassification.csv"),
+        fields=CLASSIFICATION_FIELDS,
+        alias=alias,
+        engine=engine
+    )
+
+    # Export referenced ProductRelatedComponent
+    export_required(
+        query=build_in_queries(PRC_QUERY, refs["0dS"]),
+        filename=os.path.join(out_dir, "ProductRelatedComponent.csv"),
+        fields=PRC_FIELDS,
+        alias=alias,
+        engine=engine
+    )
+
+
+# === Copy the rows one set references out of the shared supporting CSVs (no API calls) ===
+def split_supporting_objects(shared_dir, out_dir, refs):
+    for filename, prefix in (("Product2.csv", "01t"), ("ProductClassification.csv", "11B"), ("ProductRelatedComponent.csv", "0dS")):
+        wanted = set(refs[prefix])
+        with open(os.path.join(shared_dir, filename), newline="", encoding="utf-8") as src, \
+             open(os.path.join(out_dir, filename), mode="w", newline="", encoding="utf-8") as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst)
+            header = next(reader)
+            writer.writerow(header)
+            id_col = header.index("Id")
+            writer.writerows(row for row in reader if row[id_col] in wanted)
+
+
+# === DeveloperName list / wildcard resolution ===
+def resolve_developer_names(patterns, alias=SOURCE_ALIAS):
+    names = []
+    for pattern in patterns:
+        if not any(ch in pattern for ch in "*?["):
+            names.append(pattern)
+            continue
+        # LIKE narrows server-side ("_" is a LIKE wildcard too), fnmatch makes it exact
+        like = pattern.replace("*", "%").replace("?", "_").split("[")[0] + "%"
+        session = get_org_session(alias)
+        soql = f"SELECT DeveloperName FROM ExpressionSetDefinition WHERE DeveloperName LIKE {quote(like)}"
+        matched = sorted(r["DeveloperName"] for r in session.iter_query(soql)
+                         if fnmatch.fnmatchcase(r["DeveloperName"], pattern))
+        echo(f"🔎 {pattern} → {len(matched)} Expression Set Definition(s)")
+        names.extend(matched)
+    return list(dict.fromkeys(names))  # de-dupe, keep order
+
+
+# === Batch export: one directory per set, shared PCM data exported once ===
+class BatchExportError(Exception):
+    # Raised once the whole batch has run: failed maps DeveloperName -> error, exported holds the sets that made it
+    def __init__(self, failed, exported):
+        super().__init__(f"{len(failed)} of {len(failed) + len(exported)} Expression Set(s) failed: {', '.join(failed)}")
+        self.failed = failed
+        self.exported = exported
+
+
+def export_batch(dev_names, version_num, out_root=DATA_DIR, alias=SOURCE_ALIAS, workers=DEFAULT_WORKERS, engine="auto",
+                 incremental=False, bundle=False):
+    get_org_session(alias)  # resolve auth once before the workers start
+    set_dirs = {name: os.path.join(out_root, f"{name}_V{version_num}") for name in dev_names}
+    failed = {}  # one set failing must not take the rest of the batch down
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {name: pool.submit(contextvars.copy_context().run, export_expression_set, name, version_num, set_dirs[name],
+                                     alias, engine, incremental) for name in dev_names}
+        refs_by_set = {}
+        for name, future in futures.items():
+            try:
+                refs_by_set[name] = future.result()
+            except Exception as e:
+                echo(f"❌ {name}: {type(e).__name__}: {e}")
+                failed[name] = f"{type(e).__name__}: {e}"
+
+    if refs_by_set:
+        union = {prefix: sorted({i for refs in refs_by_set.values() for i in refs[prefix]}) for prefix in ("01t", "11B", "0dS")}
+        shared_dir = os.path.join(out_root, SHARED_DIR_NAME)
+        echo(f"🧩 Exporting supporting objects shared by {len(refs_by_set)} set(s) once → {shared_dir}")
+        try:
+            export_supporting_objects(union, shared_dir, alias, engine, incremental)
+        except Exception as e:
+            echo(f"❌ Shared supporting objects: {type(e).__name__}: {e}")
+            failed.update((name, f"shared supporting objects: {type(e).__name__}: {e}") for name in refs_by_set)
+            refs_by_set = {}
+
+    exported = {}
+    for name, refs in refs_by_set.items():
+        try:
+            split_supporting_objects(shared_dir, set_dirs[name], refs)
+            if bundle:
+                pack_bundle(set_dirs[name])
+        except Exception as e:
+            echo(f"❌ {name}: {type(e).__name__}: {e}")
+            failed[name] = f"{type(e).__name__}: {e}"
+            continue
+        echo(f"✅ {name} → {set_dirs[name]}")
+        exported[name] = set_dirs[name]
+
+    if failed:
+        echo(f"⛔ {len(failed)} of {len(dev_names)} Expression Set(s) failed: {', '.join(failed)}")
+        raise BatchExportError(failed, exported)
+    return exported
+
+
+# === Single-file bundle next to the export folder ===
+def pack_bundle(out_dir):
+    bundle_path = out_dir.rstrip("/\\") + BUNDLE_SUFFIX
+    manifest = write_bundle(out_dir, bundle_path)
+    echo(f"📦 Bundle → {bundle_path} ({os.path.getsize(bundle_path):,} bytes, id {manifest['id'][:12]})")
+
+
+# === Parse Arguments ===
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="export_cml.py", description="Export metadata/data for Expression Set Definitions & Versions")
+    parser.add_argument("--developerName", type=str, required=True, nargs="+",
+                        help="DeveloperName(s) of the Expression Set Definition (e.g. ProductQualification). "
+                             "Accepts several names, comma-separated lists and wildcards (e.g. 'Laptop_*')")
+    parser.add_argument("--version", type=str, default="1", help="Version number (e.g. 1)")
+    parser.add_argument("--alias", type=str, default=SOURCE_ALIAS, help="Salesforce CLI alias of the source org")
+    parser.add_argument("--outputDir", type=str, default=DATA_DIR,
+                        help="Output folder; with several sets each one gets its own <DeveloperName>_V<version> subfolder")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Expression Sets exported in parallel in batch mode")
+    parser.add_argument("--engine", choices=ENGINES, default="auto",
+                        help=f"Query engine for the large objects: REST /query, Bulk API 2.0, or auto (Bulk above {BULK_EXPORT_THRESHOLD} rows)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only fetch rows changed since the last export (SystemModstamp watermarks in <outputDir>/.export_state.json) "
+                             "and merge them into the existing CSVs by Id")
+    parser.add_argument("--profile", type=str,
+                        help="Write a JSON run profile (wall time, API calls, retries, p50/p95 latency and bytes per phase and endpoint)")
+    parser.add_argument("--bundle", action="store_true",
+                        help=f"Also pack each export folder into a single compressed <folder>{BUNDLE_SUFFIX} file")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        run_export(args.developerName, args.version, args.alias, args.outputDir, args.workers, args.engine,
+                   args.incremental, args.bundle)
+    except BatchExportError:
+        sys.exit(1)  # every failed set was already reported
+    finally:
+        if args.profile:
+            PROFILE.write(args.profile, extra={"orgs": scheduler_stats()})
+
+# Exports the named sets; returns {DeveloperName: export folder}, raises BatchExportError after the batch if any set failed
+def run_export(developer_names, version="1", alias=SOURCE_ALIAS, out_dir=DATA_DIR, workers=DEFAULT_WORKERS, engine="auto",
+               incremental=False, bundle=False):
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; expected one of {', '.join(ENGINES)}")
+    if isinstance(developer_names, str):
+        developer_names = [developer_names]
+    version_num = str(version).strip()
+    alias = alias.strip()
+    patterns = [p.strip() for arg in developer_names for p in arg.split(",") if p.strip()]
+    with phase("auth"):
+        get_org_session(alias)
+
+    # Single plain name keeps the original flat layout under the output folder
+    if len(patterns) == 1 and not any(ch in patterns[0] for ch in "*?["):
+        try:
+            refs = export_expression_set(patterns[0], version_num, out_dir, alias, engine, incremental)
+            export_supporting_objects(refs, out_dir, alias, engine, incremental)
+        except ExportError as e:
+            echo(f"⛔ {patterns[0]} failed: {e}")
+            raise BatchExportError({patterns[0]: str(e)}, {})
+        if bundle:
+            pack_bundle(out_dir)
+        return {patterns[0]: out_dir}
+
+    with phase("resolve names"):
+        dev_names = resolve_developer_names(patterns, alias)
+    if not dev_names:
+        echo("❌ No Expression Set Definitions matched.")
+        return {}
+    return export_batch(dev_names, version_num, out_dir, alias, workers, engine, incremental, bundle)
+
+if __name__ == "__main__":
+    main()
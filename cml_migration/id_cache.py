@@ -0,0 +1,157 @@
+import os
+import time
+import sqlite3
+import threading
+from .soql import datetime_literal
+
+ID_CACHE_PATH = os.environ.get(
+    "CML_ID_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cml_migration", "id_cache.sqlite")
+)
+ID_CACHE_TTL = int(os.environ.get("CML_ID_CACHE_TTL", str(7 * 24 * 3600)))  # seconds since last validation
+ID_CACHE_MAX_ENTRIES = int(os.environ.get("CML_ID_CACHE_MAX_ENTRIES", "200000"))  # per org, LRU beyond that
+
+# PRC unique keys embed parent/child/classification/relationship-type names, so a change
+# to any of those records invalidates the PRC entries that depend on them.
+DEPENDENCY_OBJECTS = ("Product2", "ProductClassification", "ProductRelationshipType")
+# Tuple UKs (PRC) are stored as text joined on the ASCII unit separator, which no record name holds
+UK_SEPARATOR = "\x1f"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS id_map (
+    org TEXT NOT NULL,
+    object TEXT NOT NULL,
+    uk TEXT NOT NULL,
+    target_id TEXT NOT NULL,
+    system_modstamp TEXT,
+    deps TEXT NOT NULL DEFAULT '',
+    validated_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (org, object, uk)
+);
+CREATE INDEX IF NOT EXISTS id_map_target ON id_map (org, object, target_id);
+CREATE INDEX IF NOT EXISTS id_map_lru ON id_map (org, last_used);
+CREATE TABLE IF NOT EXISTS watermark (
+    org TEXT NOT NULL,
+    object TEXT NOT NULL,
+    stamp TEXT NOT NULL,
+    PRIMARY KEY (org, object)
+);
+"""
+
+
+def _db_key(uk):
+    return UK_SEPARATOR.join(uk) if isinstance(uk, tuple) else uk
+
+
+# === Persistent unique key -> target Id index, one namespace per org ===
+class IdCache:
+    def __init__(self, path=ID_CACHE_PATH, ttl=ID_CACHE_TTL, max_entries=ID_CACHE_MAX_ENTRIES):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # --- reads ---
+    def get_many(self, org, obj, uks):
+        by_key = {_db_key(uk): uk for uk in uks}
+        keys = list(by_key)
+        hits = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT uk, target_id FROM id_map WHERE org = ? AND object = ? AND validated_at >= ? "
+                    f"AND uk IN ({','.join('?' * len(chunk))})",
+                    [org, obj, now - self.ttl, *chunk]
+                ).fetchall()
+                hits.update(rows)
+            if hits:
+                self._db.executemany(
+                    "UPDATE id_map SET last_used = ? WHERE org = ? AND object = ? AND uk = ?",
+                    [(now, org, obj, key) for key in hits]
+                )
+                self._db.commit()
+        return {by_key[key]: tid for key, tid in hits.items()}
+
+    # --- writes ---
+    def put_many(self, org, obj, entries):
+        # entries: [(uk, target_id, system_modstamp, deps)]
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO id_map (org, object, uk, target_id, system_modstamp, deps, validated_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(org, obj, _db_key(uk), tid, stamp, ",".join(d for d in deps if d), now, now)
+                 for uk, tid, stamp, deps in entries]
+            )
+            # Any later change to these records gets a SystemModstamp above the newest one seen now
+            stamps = [stamp for _, _, stamp, _ in entries if stamp]
+            watched = [obj] + (list(DEPENDENCY_OBJECTS) if any(deps for _, _, _, deps in entries) else [])
+            for watched_obj in watched:
+                if stamps and not self._watermark(org, watched_obj):
+                    self._set_watermark(org, watched_obj, max(stamps))
+            self._db.commit()
+        self.evict(org)
+
+    def evict(self, org):
+        with self._lock:
+            self._db.execute("DELETE FROM id_map WHERE org = ? AND validated_at < ?", (org, time.time() - self.ttl))
+            self._db.execute(
+                "DELETE FROM id_map WHERE org = ? AND rowid IN "
+                "(SELECT rowid FROM id_map WHERE org = ? ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (org, org, self.max_entries)
+            )
+            self._db.commit()
+
+    def _watermark(self, org, obj):
+        row = self._db.execute("SELECT stamp FROM watermark WHERE org = ? AND object = ?", (org, obj)).fetchone()
+        return row[0] if row else None
+
+    def _set_watermark(self, org, obj, stamp):
+        self._db.execute("INSERT OR REPLACE INTO watermark (org, object, stamp) VALUES (?, ?, ?)", (org, obj, stamp))
+
+    # === One delta query per object since its watermark: drop entries that changed or were deleted ===
+    def revalidate(self, session, org, objects):
+        changed_deps = set()
+        evicted = 0
+        for obj in list(objects) + [o for o in DEPENDENCY_OBJECTS if o not in objects]:
+            with self._lock:
+                since = self._watermark(org, obj)
+            if not since:
+                continue
+            soql = f"SELECT Id, SystemModstamp, IsDeleted FROM {obj} WHERE SystemModstamp >= {datetime_literal(since)}"
+            changed = {r["Id"]: (r["SystemModstamp"], r.get("IsDeleted")) for r in session.iter_query(soql, include_deleted=True)}
+            if not changed:
+                continue
+            with self._lock:
+                cached = dict(self._db.execute(
+                    "SELECT target_id, system_modstamp FROM id_map WHERE org = ? AND object = ?", (org, obj)
+                ).fetchall())
+                stale = [tid for tid, (stamp, deleted) in changed.items()
+                         if tid in cached and (deleted or stamp != cached[tid])]
+                self._db.executemany("DELETE FROM id_map WHERE org = ? AND object = ? AND target_id = ?",
+                                     [(org, obj, tid) for tid in stale])
+                self._set_watermark(org, obj, max([since] + [stamp for stamp, _ in changed.values()]))
+                self._db.commit()
+            evicted += len(stale)
+            if obj in DEPENDENCY_OBJECTS:
+                # Any change can be a rename; dependent PRC keys must be rebuilt
+                changed_deps.update(tid for tid, (stamp, deleted) in changed.items() if deleted or stamp > since)
+        if changed_deps:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT uk, deps FROM id_map WHERE org = ? AND deps != ''", (org,)
+                ).fetchall()
+                stale = [uk for uk, deps in rows if changed_deps.intersection(deps.split(","))]
+                self._db.executemany("DELETE FROM id_map WHERE org = ? AND object = 'ProductRelatedComponent' AND uk = ?",
+                                     [(org, uk) for uk in stale])
+                self._db.commit()
+            evicted += len(stale)
+        return evicted
@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import defaultdict
+from .blob_store import sha256_file
+
+JOURNAL_NAME = ".import_journal.jsonl"
+
+# Imports into several orgs share one journal file; appends and rewrites of a path are serialised
+_path_locks = defaultdict(threading.Lock)
+_path_locks_lock = threading.Lock()
+
+
+def _path_lock(path):
+    with _path_locks_lock:
+        return _path_locks[os.path.abspath(path)]
+
+
+# === Content hash of a source row (key order independent) ===
+def row_key(row):
+    return hashlib.sha256(json.dumps(row, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+# Identifies one export: a journal only resumes the run for the exact same input files
+def dataset_key(paths):
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        if os.path.exists(path):
+            digest.update(f"{os.path.basename(path)}:{sha256_file(path)}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+# === Append-only log of completed writes, one JSON line each, fsynced per batch ===
+class ImportJournal:
+    def __init__(self, data_dir, org, dataset, name=JOURNAL_NAME):
+        self.path = os.path.join(data_dir, name)
+        self.org = org
+        self.dataset = dataset
+        self._lock = _path_lock(self.path)
+        self._done = defaultdict(list)  # (object, op, key) -> [target Id]
+        self._load()
+
+    def _mine(self, entry):
+        return entry.get("org") == self.org and entry.get("dataset") == self.dataset
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a killed run
+                if self._mine(entry):
+                    self._done[(entry["object"], entry["op"], entry["key"])].append(entry["id"])
+
+    @property
+    def resumed(self):
+        return sum(len(ids) for ids in self._done.values())
+
+    def done(self, obj_name, op, key):
+        return list(self._done.get((obj_name, op, key), ()))
+
+    # A journaled Id that still exists in the target (valid_ids), or None
+    def find(self, obj_name, op, key, valid_ids):
+        return next((rid for rid in self.done(obj_name, op, key) if rid in valid_ids), None)
+
+    def record(self, obj_name, op, entries):
+        # entries: [(key, target Id)]
+        entries = [(key, rid) for key, rid in entries if rid]
+        if not entries:
+            return
+        now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        lines = "".join(
+            json.dumps({"org": self.org, "dataset": self.dataset, "object": obj_name, "op": op,
+                        "key": key, "id": rid, "at": now}) + "\n"
+            for key, rid in entries
+        )
+        with self._lock:
+            # Opened per batch so another org's complete() can rewrite the file in between
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            for key, rid in entries:
+                self._done[(obj_name, op, key)].append(rid)
+
+    # --- finishing ---
+    def complete(self):
+        # The run finished: drop its entries so the next import starts from a clean slate
+        with self._lock:
+            if not os.path.exists(self.path):
+                return
+            kept = []
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        if not self._mine(json.loads(line)):
+                            kept.append(line)
+                    except ValueError:
+                        continue
+            if kept:
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.writelines(kept)
+                os.replace(tmp_path, self.path)
+            else:
+                os.remove(self.path)
+
+    def discard(self):
+        # Forget an unfinished run and keep journaling a fresh one
+        self.complete()
+        self._done.clear()
+
+
+# === Drop rows the journal already wrote and whose target record still exists ===
+def skip_journaled(journal, obj_name, desired, row_keys, existing):
+    # desired: [(CSV line, record)], row_keys: {CSV line: key}, existing: target records with Id
+    remaining_existing = {rec["Id"]: rec for rec in existing}
+    todo, skipped = [], 0
+    for csv_line, rec in desired:
+        ids = [rid for rid in journal.done(obj_name, "write", row_keys[csv_line]) if rid in remaining_existing]
+        if ids:
+            remaining_existing.pop(ids[0])  # one journaled Id per identical row
+            skipped += 1
+        else:
+            todo.append((csv_line, rec))
+    return todo, list(remaining_existing.values()), skipped
@@ -0,0 +1,743 @@
+import os
+import sys
+import time
+import argparse
+import contextvars
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .sf_session import get_org_session, scheduler_stats
+from .sf_collections import create_records, update_records, delete_records, format_errors, DEFAULT_CONCURRENCY
+from .esc_sync import plan_sync
+from .soql import chunked_query
+from .blob_store import Base64JsonBody, remote_sha256, sha256_file
+from .id_cache import IdCache
+from .sf_bulk import bulk_delete
+from .composite_graph import GraphPlan, submit_plan, node_record_id, GRAPH_MAX_NODES
+from .import_journal import ImportJournal, row_key, skip_journaled
+from .preflight import run_preflight
+from .uk_index import REFERENCE_PREFIXES, UK_COLUMNS, legacy_uk_maps, prc_target_uk, format_uk
+from .cml_model import load_model, CmlParseError
+from .export_bundle import open_export
+from .run_profile import PROFILE, phase, profiled
+from .output import echo, output, output_to, LabelledOutput
+
+DATA_DIR = "data"
+TARGET_ALIAS = "vpuat"
+BULK_DELETE_THRESHOLD = 10000  # above this many Ids, deletes go through a Bulk API 2.0 job
+# The only ExpressionSetConstraintObj columns the import writes or checks (Id, Name and the ExpressionSet are replaced)
+ESC_COLUMNS = ("ReferenceObjectId", "ConstraintModelTag", "ConstraintModelTagType")
+
+# Outcome of one org's import
+OrgResult = namedtuple("OrgResult", ["alias", "status", "detail", "seconds"])
+# Per-call import settings; the fields mirror the CLI flags, so parsed arguments convert one to one
+ImportOptions = namedtuple("ImportOptions", [
+    "concurrency", "bulkDeleteThreshold", "noIdCache", "forceBlobUpload", "noGraph", "graphSize",
+    "preflightOnly", "preflightReport", "restart", "workers",
+], defaults=[DEFAULT_CONCURRENCY, BULK_DELETE_THRESHOLD, False, False, False, GRAPH_MAX_NODES, False, None, False, None])
+STATUS_ICONS = {"imported": "✅", "preflight passed": "🧪", "preflight failed": "⛔", "failed": "❌"}
+SUCCESS_STATUSES = ("imported", "preflight passed")
+
+# === Concurrent read fan-out over the pooled session ===
+def run_concurrently(tasks, max_workers=8):
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as pool:
+        futures = {name: pool.submit(contextvars.copy_context().run, fn) for name, fn in tasks.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+def query_first_id(session, soql):
+    for rec in session.iter_query(soql):
+        return rec["Id"]
+    return None
+
+# === Target Id resolution through the persistent ID cache ===
+def resolve_target_ids(session, id_cache, obj_name, uks, query_template, filter_values, key_fn, deps_fn=None, ambiguous=None):
+    org = session.instance_url
+    uk_to_id = id_cache.get_many(org, obj_name, uks) if id_cache else {}
+    missing = set(uks) - uk_to_id.keys()
+    entries = []
+    if missing:
+        for r in chunked_query(session, query_template, filter_values(missing)):
+            uk = key_fn(r)
+            if uk is None:
+                continue
+            if ambiguous is not None and uk_to_id.get(uk, r["Id"]) != r["Id"]:
+                ambiguous.add(uk)  # several target records share this UK
+            uk_to_id[uk] = r["Id"]
+            entries.append((uk, r["Id"], r.get("SystemModstamp"), deps_fn(r) if deps_fn else ()))
+        if id_cache and entries:
+            id_cache.put_many(org, obj_name, entries)
+    if id_cache:
+        echo(f"🗃️ {obj_name}: {len(uks) - len(missing)} cached, {len(missing)} queried")
+    return uk_to_id
+
+# === REST: POST ===
+def create_record(obj_name, record, session):
+    url = session.sobject_url(obj_name)
+
+    record.pop("Id", None)
+    resp = session.post(url, json=record)
+    if resp.status_code == 201:
+        echo(f"✅ Created {obj_name} → {record.get('Name', record.get('ApiName', '') )}")
+        return resp.json()["id"]
+    else:
+        echo(f"❌ Failed {obj_name}: {resp.status_code} - {resp.text}")
+        return None
+    
+def upsert_expression_set(record, session, existing_records=None):
+    obj_name = "ExpressionSet"
+    api_name = record.get("ApiName")
+    if not api_name:
+        echo("❌ ExpressionSet record missing ApiName. Skipping.")
+        return None
+
+    if existing_records is not None:
+        records = existing_records  # already looked up by the caller
+    else:
+        # Query to see if the ExpressionSet exists
+        soql = f"SELECT Id FROM {obj_name} WHERE ApiName = '{api_name}'"
+        resp = session.get(session.query_url, params={"q": soql})
+
+        if resp.status_code != 200:
+            echo(f"❌ Failed to query for ExpressionSet {api_name}: {resp.status_code} - {resp.text}")
+            return None
+
+        records = resp.json().get("records", [])
+    record.pop("ExpressionSetDefinitionId", None)
+    
+    if records:
+        # UPDATE (PATCH)
+        record_id = records[0]["Id"]
+        patch_url = session.sobject_url(obj_name, record_id)
+        record.pop("ApiName", None)  # Don't include ApiName in the body
+        patch_resp = session.patch(patch_url, json=record)
+        record["ApiName"] = api_name  # 👈 Put it back
+        if patch_resp.status_code in [204, 200]:
+            echo(f"🔁 Updated ExpressionSet → {api_name}")
+            return record_id
+        else:
+            echo(f"❌ Failed to update ExpressionSet: {patch_resp.status_code} - {patch_resp.text}")
+            return None
+    else:
+        # CREATE (POST)
+        echo(f"➕ Creating new ExpressionSet → {api_name}")
+        return create_record(obj_name, record, session)
+
+
+def upsert_esdcd(record, session):
+    obj_name = "ExpressionSetDefinitionContextDefinition"
+    context_id = record.get("ContextDefinitionId")
+    esd_id = record.get("ExpressionSetDefinitionId")
+
+    if not context_id or not esd_id:
+        echo("❌ Missing ContextDefinitionId or ExpressionSetDefinitionId for ESDCD.")
+        return None
+
+    # Query for existence
+    soql = f"""
+        SELECT Id FROM {obj_name}
+        WHERE ExpressionSetDefinitionId = '{esd_id}'
+    """
+    resp = session.get(session.query_url, params={"q": soql.strip()})
+
+    if resp.status_code != 200:
+        echo(f"❌ Query failed for ESDCD: {resp.status_code} - {resp.text}")
+        return None
+
+    found = resp.json().get("records", [])
+
+    if found:
+        record_id = found[0]["Id"]
+        echo("✅ ExpressionSetDefinitionContextDefinition already exists. Updating ContextDefinitionId...")
+
+        # Only update ContextDefinitionId
+        patch_url = session.sobject_url(obj_name, record_id)
+        patch_body = { "ContextDefinitionId": context_id }
+
+        patch_resp = session.patch(patch_url, json=patch_body)
+        if patch_resp.status_code in [200, 204]:
+            echo(f"🔁 Updated ContextDefinitionId on existing ESDCD → {record_id}")
+            return record_id
+        else:
+            echo(f"❌ Failed to update ESDCD: {patch_resp.status_code} - {patch_resp.text}")
+            return None
+
+    echo("➕ Creating ExpressionSetDefinitionContextDefinition")
+    return create_record(obj_name, record, session)
+
+def write_esdcd(esdcd, esd_id, session, journal, esdcd_key):
+    esdcd["ExpressionSetDefinitionId"] = esd_id
+    esdcd_id = upsert_esdcd(esdcd, session)
+    if not esdcd_id:
+        echo("❌ Could not create or update ExpressionSetDefinitionContextDefinition. Aborting.")
+        return None
+    journal.record("ExpressionSetDefinitionContextDefinition", "write", [(esdcd_key, esdcd_id)])
+    return esdcd_id
+
+# A brand-new ExpressionSet brings its definition + version with it; look those up once it is written.
+# Returns (esdv_id, esd_id, error), error naming the record that could not be found.
+def definition_ids(session, resolved, devname, apiname):
+    esdv_id, esd_id = resolved["esdv"], resolved["esd"]
+    if not resolved["ess"]:
+        late = run_concurrently({
+            "esdv": lambda: query_first_id(session, f"SELECT Id FROM ExpressionSetDefinitionVersion WHERE DeveloperName = '{devname}'"),
+            "esd": lambda: query_first_id(session, f"SELECT Id FROM ExpressionSetDefinition WHERE DeveloperName = '{apiname}'"),
+        })
+        esdv_id, esd_id = late["esdv"], late["esd"]
+    if not esdv_id:
+        echo(f"❌ Could not find ExpressionSetDefinitionVersion for {devname}")
+        return esdv_id, esd_id, f"ExpressionSetDefinitionVersion {devname} not found"
+    if not esd_id:
+        echo(f"❌ Could not find ExpressionSetDefinition for {apiname}")
+        return esdv_id, esd_id, f"ExpressionSetDefinition {apiname} not found"
+    return esdv_id, esd_id, None
+
+
+# === Map each ESC row's legacy ReferenceObjectId to its target Id ===
+def resolve_esc_rows(esc_list, ess_id, legacy_to_uk, target_maps):
+    # target_maps: object name -> {UK: target Id}
+    desired = []  # (CSV line number, resolved record)
+    unresolved = 0
+    for csv_line, row in enumerate(esc_list, start=2):  # line 1 is the header
+        row = dict(row)  # the export's rows are shared by every target org
+        row.pop("Id", None)
+        row.pop("ExpressionSet.ApiName", None)
+        row.pop("Name", None)
+        row["ExpressionSetId"] = ess_id
+
+        ref_id = row.get("ReferenceObjectId", "")
+        uk = legacy_to_uk.get(ref_id)
+        resolved_id = target_maps.get(REFERENCE_PREFIXES.get(ref_id[:3]), {}).get(uk)
+
+        if resolved_id:
+            row["ReferenceObjectId"] = resolved_id
+            desired.append((csv_line, row))
+        else:
+            echo(f"⚠️ Could not resolve ReferenceObjectId: {ref_id} → UK: {format_uk(uk)}")
+            unresolved += 1
+    return desired, unresolved
+
+# === Composite Graph: ExpressionSet, ESDCD and the ESC delta as all-or-nothing graphs ===
+def build_graph_plan(session, ess, existing_ess, esdcd, esdcd_id, esd_id, esc_delta, skip_ess=False, skip_esdcd=False):
+    # esc_delta: callable(ess_id) -> (SyncPlan, unresolved count); a new ExpressionSet is referenced as @{ExpressionSet.id}
+    plan = GraphPlan(session)
+    ess = dict(ess)
+    ess.pop("ExpressionSetDefinitionId", None)
+    if existing_ess:
+        ess_id = existing_ess[0]["Id"]
+        ess.pop("ApiName", None)
+        if not skip_ess:
+            plan.update("ExpressionSet", "ExpressionSet", ess_id, ess, label=f"ExpressionSet {ess_id}")
+    else:
+        ess_id = plan.create("ExpressionSet", "ExpressionSet", ess, label="ExpressionSet (new)")
+
+    # A new ExpressionSet's definition only exists once it is committed; its ESDCD follows the graph
+    if esd_id and not skip_esdcd:
+        if esdcd_id:
+            plan.update("ESDCD", "ExpressionSetDefinitionContextDefinition", esdcd_id,
+                        {"ContextDefinitionId": esdcd["ContextDefinitionId"]}, label=f"ESDCD {esdcd_id}")
+        else:
+            record = dict(esdcd, ExpressionSetDefinitionId=esd_id)
+            record.pop("Id", None)
+            plan.create("ESDCD", "ExpressionSetDefinitionContextDefinition", record, label="ESDCD (new)")
+
+    sync, unresolved = esc_delta(ess_id)
+    for csv_line, rec in sync.inserts:
+        plan.create(f"ESC_{csv_line}", "ExpressionSetConstraintObj", rec, label=f"ExpressionSetConstraintObj (CSV line {csv_line})")
+    for csv_line, rec in sync.updates:
+        rec = dict(rec)
+        plan.update(f"ESC_{csv_line}", "ExpressionSetConstraintObj", rec.pop("Id"), rec,
+                    label=f"ExpressionSetConstraintObj (CSV line {csv_line})")
+    # Deletes go last: with several graphs they only run once every write before them committed
+    for n, record_id in enumerate(sync.deletes, start=1):
+        plan.delete(f"ESC_del_{n}", "ExpressionSetConstraintObj", record_id, label=f"ExpressionSetConstraintObj {record_id} (delete)")
+    return plan, sync, unresolved
+
+# Journal every node of a committed graph under the hash of the source row it came from
+def journal_graph(journal, ess_key, esdcd_key, esc_keys):
+    singles = {"ExpressionSet": ("ExpressionSet", ess_key),
+               "ESDCD": ("ExpressionSetDefinitionContextDefinition", esdcd_key)}
+
+    def on_graph(nodes, ids):
+        entries = defaultdict(list)
+        for node in nodes:
+            record_id = node_record_id(node, ids)
+            if node.method == "DELETE":
+                entries[("ExpressionSetConstraintObj", "delete")].append((record_id, record_id))
+            elif node.ref in singles:
+                obj_name, key = singles[node.ref]
+                entries[(obj_name, "write")].append((key, record_id))
+            else:
+                entries[("ExpressionSetConstraintObj", "write")].append((esc_keys[int(node.ref.split("_")[1])], record_id))
+        for (obj_name, op), batch in entries.items():
+            journal.record(obj_name, op, batch)
+    return on_graph
+
+# === REST: PATCH blob ===
+def upload_blob_via_patch(record_id, blob_path, session, skip_unchanged=True):
+    # Build the endpoint for the record (omitting the /ConstraintModel sub-path)
+    url = session.sobject_url("ExpressionSetDefinitionVersion", record_id)
+
+    # Skip the PATCH when the target already holds the same model
+    if skip_unchanged:
+        local_sha = sha256_file(blob_path)
+        if remote_sha256(session, url + "/ConstraintModel") == local_sha:
+            echo(f"⏭️ Blob unchanged on target, skipping upload → {record_id}")
+            return True
+
+    # The ConstraintModel field expects a base64 string; the JSON body is streamed
+    # from the file in encoded chunks rather than built in memory.
+    payload = Base64JsonBody(blob_path, "ConstraintModel")
+    # Use PATCH to update the record
+    resp = session.patch(url, data=payload, headers={"Content-Type": "application/json"})
+    if resp.status_code == 204:
+        echo(f"📦 Uploaded blob via PATCH → {record_id}")
+        return True
+    echo(f"⚠️ Blob upload failed → {record_id}: {resp.status_code} - {resp.text}")
+    return False
+
+# === Delete superseded records ===
+@profiled("deletes")
+def delete_old_records(obj_name, ids, session, concurrency, bulk_threshold, on_batch=None):
+    if len(ids) > bulk_threshold:
+        results = bulk_delete(session, obj_name, ids, hard=True)
+        if on_batch:
+            on_batch(results)
+    else:
+        results = delete_records(session, ids, max_workers=concurrency, on_batch=on_batch)
+    failed = [r for r in results if not r.success]
+    for r in failed:
+        echo(f"⚠️ Failed to delete {r.id}: {format_errors(r.errors)}")
+    return len(ids) - len(failed), failed
+
+# === Local export: read, keyed and checked once, then shared by every target org ===
+class LocalExport:
+    # source: an export folder or a .cmlbundle (export_bundle.open_export); rows stream with only the columns used
+    def __init__(self, source):
+        self.source = source
+        self.journal_dir = source.journal_dir
+        self.esdv = next(source.rows("ExpressionSetDefinitionVersion"))
+        self.esdcd = next(source.rows("ExpressionSetDefinitionContextDefinition"))
+        self.ess = next(source.rows("ExpressionSet"))
+        self.esc_list = list(source.rows("ExpressionSetConstraintObj", ESC_COLUMNS))
+
+        self.ess.pop("Id", None)
+        self.devname = self.esdv["DeveloperName"]
+        self.apiname = self.ess["ApiName"]
+        self.cd_apiname = self.esdcd.pop("ContextDefinitionApiName", "").strip()
+        self.esdcd.pop("ExpressionSetApiName", None)
+        blob = blob_name(self.esdv, self.devname)
+        self.blob_file = source.blob_file(blob) or os.path.join(source.path, "blobs", blob)
+
+        # Journal keys are content hashes of the source rows, taken before target Ids are resolved into them
+        self.ess_key, self.esdcd_key = row_key(self.ess), row_key(self.esdcd)
+        self.esc_keys = {csv_line: row_key(row) for csv_line, row in enumerate(self.esc_list, start=2)}
+        self.dataset = source.dataset_key(blob)
+
+        # === Build lookup maps for ReferenceObjectId resolution ===
+        echo("🔁 Building legacy ID to Unique Key (UK) maps...")
+        self.legacy_to_uk, self.source_uks, self.source_duplicates = legacy_uk_maps(
+            source.rows("Product2", UK_COLUMNS["Product2"]),
+            source.rows("ProductClassification", UK_COLUMNS["ProductClassification"]),
+            source.rows("ProductRelatedComponent", UK_COLUMNS["ProductRelatedComponent"]),
+        )
+
+        # The CML model feeds the pre-flight tag checks of every target
+        self.model = None
+        if os.path.exists(self.blob_file):
+            try:
+                self.model = load_model(self.blob_file, sha=source.blob_sha256(blob))
+            except CmlParseError as e:
+                echo(f"⚠️ CML blob does not parse ({e}); skipping model tag checks")
+
+# === Import into one target org; returns (status, detail) for the multi-target summary ===
+def import_into_org(alias, export, options, per_org=False):
+    with phase("auth"):
+        session = get_org_session(alias)
+    echo(f"API Version is: {session.api_version}")
+
+    # Per-org copies: target Ids are written into these records
+    ess = dict(export.ess)
+    esdcd = dict(export.esdcd)
+    devname, apiname, cd_apiname = export.devname, export.apiname, export.cd_apiname
+    blob_file, ess_key, esdcd_key, esc_keys = export.blob_file, export.ess_key, export.esdcd_key, export.esc_keys
+    legacy_to_uk = export.legacy_to_uk
+
+    # === Operation journal: a rerun after a crash skips writes the previous run completed ===
+    journal = ImportJournal(export.journal_dir, session.instance_url, export.dataset)
+    if options.restart:
+        journal.discard()
+    elif journal.resumed:
+        echo(f"↩️ Resuming an unfinished import: {journal.resumed} operations already done")
+
+    product_names = export.source_uks["Product2"]
+    classification_names = export.source_uks["ProductClassification"]
+    prc_uks = export.source_uks["ProductRelatedComponent"]
+
+    # === Resolve everything in the target org concurrently ===
+    echo("📡 Querying target org for new IDs...")
+
+    # Query target org for Product2 (IN lists are split into size-bounded chunks run in parallel)
+    q1 = "SELECT Id, Name, SystemModstamp FROM Product2 WHERE Name IN ({values})"
+
+    # Query target org for ProductClassification
+    q2 = "SELECT Id, Name, SystemModstamp FROM ProductClassification WHERE Name IN ({values})"
+
+    # Query target org for ProductRelatedComponent
+    q3 = """
+    SELECT Id,
+        ParentProductId, ParentProduct.Name,
+        ChildProductId, ChildProduct.Name,
+        ChildProductClassificationId, ChildProductClassification.Name,
+        ProductRelationshipTypeId, ProductRelationshipType.Name, Sequence, SystemModstamp
+    FROM ProductRelatedComponent
+    WHERE ParentProduct.Name IN ({values})
+    """
+
+    # Repeat imports into the same org resolve mostly from the local ID cache;
+    # only keys missing from it (or invalidated by the delta check) hit the org.
+    id_cache = None if options.noIdCache else IdCache()
+
+    # Target UKs that matched more than one record; pre-flight reports them as ambiguous
+    ambiguous = {"Product2": set(), "ProductClassification": set(), "ProductRelatedComponent": set()}
+
+    def resolve_references():
+        if id_cache:
+            evicted = id_cache.revalidate(session, session.instance_url,
+                                          ["Product2", "ProductClassification", "ProductRelatedComponent"])
+            if evicted:
+                echo(f"🗃️ ID cache: {evicted} entries changed in the target org since last run")
+        return run_concurrently({
+            "Product2": lambda: resolve_target_ids(
+                session, id_cache, "Product2", product_names, q1, lambda missing: missing, lambda r: r["Name"],
+                ambiguous=ambiguous["Product2"]),
+            "ProductClassification": lambda: resolve_target_ids(
+                session, id_cache, "ProductClassification", classification_names, q2, lambda missing: missing,
+                lambda r: r["Name"], ambiguous=ambiguous["ProductClassification"]),
+            # PRC keys are tuples; the parent product name (first element) narrows the query
+            "ProductRelatedComponent": lambda: resolve_target_ids(
+                session, id_cache, "ProductRelatedComponent", prc_uks, q3, lambda missing: {uk[0] for uk in missing},
+                prc_target_uk,
+                lambda r: (r.get("ParentProductId"), r.get("ChildProductId"),
+                           r.get("ChildProductClassificationId"), r.get("ProductRelationshipTypeId")),
+                ambiguous=ambiguous["ProductRelatedComponent"]),
+        })
+
+    # Query all current ESC objects for the ExpressionSet (by ApiName, so it needs no ExpressionSet Id)
+    esc_query = f"""
+        SELECT Id, ReferenceObjectId, ConstraintModelTag, ConstraintModelTagType
+        FROM ExpressionSetConstraintObj
+        WHERE ExpressionSet.ApiName = '{apiname}'
+    """
+
+    with phase("resolve"):
+        resolved = run_concurrently({
+            "ess": lambda: session.query(f"SELECT Id FROM ExpressionSet WHERE ApiName = '{apiname}'"),
+            "esdv": lambda: query_first_id(session, f"SELECT Id FROM ExpressionSetDefinitionVersion WHERE DeveloperName = '{devname}'"),
+            "cd": lambda: query_first_id(session, f"SELECT Id FROM ContextDefinition WHERE DeveloperName = '{cd_apiname}'"),
+            "esd": lambda: query_first_id(session, f"SELECT Id FROM ExpressionSetDefinition WHERE DeveloperName = '{apiname}'"),
+            "refs": resolve_references,
+            "esc": lambda: list(session.iter_query(esc_query)),
+            "esdcd": lambda: query_first_id(session, f"SELECT Id FROM ExpressionSetDefinitionContextDefinition "
+                                                     f"WHERE ExpressionSetDefinition.DeveloperName = '{apiname}'"),
+        })
+
+    if id_cache:
+        id_cache.close()
+    if not resolved["cd"]:
+        echo(f"❌ Could not find ContextDefinition for {cd_apiname}")
+        return "failed", f"ContextDefinition {cd_apiname} not found"
+    esdcd["ContextDefinitionId"] = resolved["cd"]
+    target_maps = resolved["refs"]  # object name -> {UK: target Id}
+    existing_esc = resolved["esc"]
+
+    echo("🔁 Maps ready. Resolving ReferenceObjectIds...")
+
+    # === Pre-flight: every mapping problem is reported before the first write ===
+    with phase("preflight"):
+        report = run_preflight(export.esc_list, legacy_to_uk, target_maps,
+                               ambiguous, export.source_duplicates, export.model)
+    report.print_summary()
+    if options.preflightReport:
+        report_path = preflight_report_path(options.preflightReport, alias, per_org)
+        report.write(report_path)
+        echo(f"📄 Pre-flight report saved to {report_path}")
+    checks = f"{len(report.errors)} errors, {len(report.warnings)} warnings"
+    if report.errors:
+        echo("⛔ Pre-flight failed. Nothing was written to the target org.")
+        return "preflight failed", checks
+    if options.preflightOnly:
+        return "preflight passed", checks
+
+    def esc_delta(ess_id):
+        desired, unresolved = resolve_esc_rows(export.esc_list, ess_id, legacy_to_uk, target_maps)
+        desired, existing, skipped = skip_journaled(journal, "ExpressionSetConstraintObj", desired, esc_keys, existing_esc)
+        if skipped:
+            echo(f"↩️ {skipped} ExpressionSetConstraintObj rows were already written by the unfinished run")
+        return plan_sync(existing, desired), unresolved
+
+    if not options.noGraph:
+        esdv_id, sync = graph_import(session, options, ess, resolved, esdcd, esc_delta, devname, apiname,
+                                     journal, ess_key, esdcd_key, esc_keys)
+        if not esdv_id:
+            return "failed", "graph import did not complete"
+        if not upload_blob(blob_file, esdv_id, session, options, journal):
+            return "failed", "blob upload failed"
+        journal.complete()
+        return "imported", sync_summary(sync)
+
+    # === Insert ExpressionSet
+    #ess_id = create_record("ExpressionSet", ess, session)
+    ess_id = journal.find("ExpressionSet", "write", ess_key, {r["Id"] for r in resolved["ess"]})
+    if ess_id:
+        echo(f"↩️ ExpressionSet already written by the unfinished run → {ess_id}")
+    else:
+        with phase("writes"):
+            ess_id = upsert_expression_set(ess, session, existing_records=resolved["ess"])
+        if not ess_id:
+            echo("❌ Could not create or update ExpressionSet. Aborting.")
+            return "failed", "ExpressionSet not written"
+        journal.record("ExpressionSet", "write", [(ess_key, ess_id)])
+
+    esdv_id, esd_id, missing = definition_ids(session, resolved, devname, apiname)
+    if missing:
+        return "failed", missing
+
+    # === Insert ExpressionSetDefinitionContextDefinition
+    #create_record("ExpressionSetDefinitionContextDefinition", esdcd, session)
+    if journal.find("ExpressionSetDefinitionContextDefinition", "write", esdcd_key, {resolved["esdcd"]}):
+        echo("↩️ ExpressionSetDefinitionContextDefinition already written by the unfinished run")
+    else:
+        with phase("writes"):
+            if not write_esdcd(esdcd, esd_id, session, journal, esdcd_key):
+                return "failed", "ExpressionSetDefinitionContextDefinition not written"
+
+    # === Sync ExpressionSetConstraintObj
+    echo("📥 Syncing ExpressionSetConstraintObj records...")
+
+    # Step 2: Diff against the target and only write the delta
+    plan, unresolved = esc_delta(ess_id)
+    import_failed = unresolved > 0
+    echo(f"🧮 Sync plan: {plan.unchanged} unchanged, {len(plan.inserts)} to insert, "
+         f"{len(plan.updates)} to update, {len(plan.deletes)} to delete")
+
+    # Each collection batch is journaled as soon as it returns, so a rerun resumes at the failed batch
+    def journal_writes(ops):
+        return lambda results: journal.record("ExpressionSetConstraintObj", "write",
+                                              [(esc_keys[ops[r.index][0]], r.id) for r in results if r.success])
+
+    for label, writer, ops in (
+        ("created", create_records, plan.inserts),
+        ("updated", update_records, plan.updates),
+    ):
+        if not ops:
+            continue
+        ok_count = 0
+        with phase("writes"):
+            results = writer(session, "ExpressionSetConstraintObj", [rec for _, rec in ops],
+                             max_workers=options.concurrency, on_batch=journal_writes(ops))
+        for (csv_line, rec), result in zip(ops, results):
+            if result.success:
+                ok_count += 1
+            else:
+                echo(f"❌ Failed ExpressionSetConstraintObj (CSV line {csv_line}): {format_errors(result.errors)}")
+                import_failed = True
+        echo(f"📊 {ok_count} ExpressionSetConstraintObj records {label}.")
+
+    # Step 3: Only remove stale records once everything else landed
+    if not import_failed:
+        if plan.deletes:
+            echo(f"🗑️ Deleting {len(plan.deletes)} stale ExpressionSetConstraintObj records...")
+            deleted, failed = delete_old_records(
+                "ExpressionSetConstraintObj", plan.deletes, session, options.concurrency, options.bulkDeleteThreshold,
+                on_batch=lambda results: journal.record("ExpressionSetConstraintObj", "delete",
+                                                        [(r.id, r.id) for r in results if r.success])
+            )
+            import_failed = bool(failed)
+            if failed:
+                echo(f"⚠️ {deleted} stale records deleted, {len(failed)} failed.")
+            else:
+                echo("✅ Stale records deleted.")
+    else:
+        echo("⛔ Import encountered errors. Skipping deletion of stale ExpressionSetConstraintObj records.")
+        echo("⚠️ Warning: Target org may now contain a mix of old and new constraints. Manual cleanup may be needed.")
+
+
+    # === Upload Blob
+    if not upload_blob(blob_file, esdv_id, session, options, journal):
+        return "failed", "blob upload failed"
+    if import_failed:
+        return "failed", "some ExpressionSetConstraintObj writes failed"
+    journal.complete()
+    return "imported", sync_summary(plan)
+
+def sync_summary(plan):
+    return (f"{plan.unchanged} unchanged, {len(plan.inserts)} inserted, "
+            f"{len(plan.updates)} updated, {len(plan.deletes)} deleted")
+
+def preflight_report_path(path, alias, per_org):
+    # report.json → report.<alias>.json when several orgs are checked in one run
+    if not per_org:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{alias}{ext}"
+
+# === Multi-target import: one worker per org, output prefixed with the org alias ===
+def run_import(alias, export, options, per_org=True):
+    started = time.monotonic()
+    with output_to(LabelledOutput(output(), alias)):
+        try:
+            with phase(f"org {alias}"):
+                status, detail = import_into_org(alias, export, options, per_org)
+        except Exception as e:  # one org failing must not take the other imports down
+            echo(f"❌ {type(e).__name__}: {e}")
+            status, detail = "failed", f"{type(e).__name__}: {e}"
+    return OrgResult(alias, status, detail, time.monotonic() - started)
+
+def import_targets(aliases, export, options):
+    echo(f"🚀 Importing {export.apiname} into {len(aliases)} orgs: {', '.join(aliases)}")
+    started = time.monotonic()
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, options.workers or len(aliases))) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, run_import, alias, export, options) for alias in aliases]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            echo(f"{STATUS_ICONS[result.status]} {result.alias}: {result.status} in {result.seconds:.1f}s "
+                 f"({len(results)}/{len(aliases)} orgs done)")
+
+    echo(f"📋 Summary ({time.monotonic() - started:.1f}s wall clock, "
+         f"{sum(r.seconds for r in results):.1f}s summed over orgs):")
+    width = max(len(alias) for alias in aliases)
+    for result in sorted(results, key=lambda r: aliases.index(r.alias)):
+        echo(f"  {STATUS_ICONS[result.status]} {result.alias:<{width}}  {result.status:<16} "
+             f"{result.seconds:6.1f}s  {result.detail}")
+    return results
+
+# === MAIN ===
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="import_cml.py", description="Import a Constraint Expression Set export into the target org")
+    parser.add_argument("--alias", type=str, nargs="+", default=[TARGET_ALIAS],
+                        help="Salesforce CLI alias(es) of the target org(s); several aliases (or a comma-separated list) "
+                             "import the same export into every org in parallel")
+    parser.add_argument("--workers", type=int,
+                        help="Target orgs imported in parallel (default: all of them)")
+    parser.add_argument("--dataDir", type=str, default=DATA_DIR,
+                        help="Folder holding the export (e.g. data/Laptop_Pro_Bundle_V1 for a batch export) or a .cmlbundle file")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Max concurrent sObject Collections requests (200 records each)")
+    parser.add_argument("--bulkDeleteThreshold", type=int, default=BULK_DELETE_THRESHOLD,
+                        help="Delete old ExpressionSetConstraintObj records with a Bulk API 2.0 hardDelete job above this count")
+    parser.add_argument("--noIdCache", action="store_true",
+                        help="Resolve every Product2/ProductClassification/PRC against the org, bypassing the local ID cache")
+    parser.add_argument("--forceBlobUpload", action="store_true",
+                        help="Upload the blob even when the target already holds an identical ConstraintModel")
+    parser.add_argument("--noGraph", action="store_true",
+                        help="Write record by record / per collection instead of as all-or-nothing Composite Graph requests")
+    parser.add_argument("--graphSize", type=int, default=GRAPH_MAX_NODES,
+                        help="Max nodes per Composite Graph; a plan larger than this is split into several graphs")
+    parser.add_argument("--preflightOnly", action="store_true",
+                        help="Resolve and validate every mapping against the target org, then stop before writing")
+    parser.add_argument("--preflightReport", type=str,
+                        help="Write the full pre-flight report (all errors and warnings) to this JSON file "
+                             "(one <name>.<alias>.json per org with several targets)")
+    parser.add_argument("--profile", type=str,
+                        help="Write a JSON run profile (wall time, API calls, retries, p50/p95 latency and bytes per phase and endpoint)")
+    parser.add_argument("--restart", action="store_true",
+                        help="Discard the journal of an unfinished import into this org and start over")
+    args = parser.parse_args(argv)
+    args.targets = split_aliases(args.alias)
+    return args
+
+def split_aliases(aliases):
+    if isinstance(aliases, str):
+        aliases = [aliases]
+    return list(dict.fromkeys(a.strip() for arg in aliases for a in arg.split(",") if a.strip()))
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        results = run(args.dataDir, args.targets, ImportOptions(**{name: getattr(args, name) for name in ImportOptions._fields}))
+        if any(r.status not in SUCCESS_STATUSES for r in results):
+            sys.exit(1)  # every failed org was already reported
+    finally:
+        if args.profile:
+            PROFILE.write(args.profile, extra={"orgs": scheduler_stats()})
+
+# Imports one export (folder or bundle) into every target org; returns one OrgResult per org
+def run(data_dir, targets, options=ImportOptions()):
+    targets = split_aliases(targets)
+    # The export is read, hashed and mapped once, however many orgs it goes to
+    source = open_export(data_dir)
+    try:
+        with phase("load export"):
+            export = LocalExport(source)
+        if not export.cd_apiname:
+            echo("❌ Invalid ExpressionSetDefinitionContextDefinition: missing ContextDefinitionApiName.")
+            echo("⚠️ Please ensure your CML Expression Set is using an extended custom Context Definition.")
+            return [OrgResult(alias, "failed", "missing ContextDefinitionApiName", 0.0) for alias in targets]
+
+        if len(targets) == 1:
+            started = time.monotonic()
+            with phase(f"org {targets[0]}"):
+                status, detail = import_into_org(targets[0], export, options)
+            return [OrgResult(targets[0], status, detail, time.monotonic() - started)]
+        return import_targets(targets, export, options)
+    finally:
+        source.close()
+
+def blob_name(esdv, devname):
+    version = esdv.get("VersionNumber")
+    return f"ESDV_{devname.replace('_V' + version, '')}_V{version}.ffxblob"
+
+@profiled("blob upload")
+def upload_blob(blob_file, esdv_id, session, options, journal):
+    if not os.path.exists(blob_file):
+        echo(f"⚠️ Blob file missing: {blob_file}")
+        return True
+    # The dataset key already covers the blob's content, so its file name identifies it here
+    key = os.path.basename(blob_file)
+    if journal.find("ExpressionSetDefinitionVersion", "blob", key, {esdv_id}):
+        echo(f"↩️ Blob already uploaded by the unfinished run → {esdv_id}")
+        return True
+    if not upload_blob_via_patch(esdv_id, blob_file, session, skip_unchanged=not options.forceBlobUpload):
+        return False
+    journal.record("ExpressionSetDefinitionVersion", "blob", [(key, esdv_id)])
+    return True
+
+@profiled("writes")
+def graph_import(session, options, ess, resolved, esdcd, esc_delta, devname, apiname, journal, ess_key, esdcd_key, esc_keys):
+    skip_ess = bool(journal.find("ExpressionSet", "write", ess_key, {r["Id"] for r in resolved["ess"]}))
+    skip_esdcd = bool(journal.find("ExpressionSetDefinitionContextDefinition", "write", esdcd_key, {resolved["esdcd"]}))
+    plan, sync, unresolved = build_graph_plan(session, ess, resolved["ess"], esdcd, resolved["esdcd"], resolved["esd"],
+                                              esc_delta, skip_ess, skip_esdcd)
+    echo(f"🧮 Sync plan: {sync.unchanged} unchanged, {len(sync.inserts)} to insert, "
+         f"{len(sync.updates)} to update, {len(sync.deletes)} to delete")
+    if unresolved:
+        echo(f"⛔ {unresolved} ExpressionSetConstraintObj rows could not be resolved. Nothing was written to the target org.")
+        return None, sync
+
+    graphs = plan.graphs(options.graphSize)
+    echo(f"🕸️ Submitting {len(plan)} writes as {len(graphs)} Composite Graph request(s)...")
+    if len(graphs) > 1:
+        echo("⚠️ The plan exceeds one graph; each graph is atomic, but graphs commit one after another.")
+    result = submit_plan(session, plan, options.graphSize, on_graph=journal_graph(journal, ess_key, esdcd_key, esc_keys))
+    if not result.success:
+        for e in result.errors:
+            echo(f"❌ Failed {e.get('node')}: {e.get('errorCode')}: {e.get('message')}")
+        if result.committed:
+            echo(f"⚠️ {result.committed} of {result.total} graphs were committed before the failure; "
+                 f"stale records were not deleted.")
+        else:
+            echo("⛔ Graph rolled back. Nothing was written to the target org.")
+        return None, sync
+    echo(f"✅ Committed {len(plan)} writes in {result.total} graph(s).")
+
+    esdv_id, esd_id, missing = definition_ids(session, resolved, devname, apiname)
+    if missing:
+        return None, sync
+    # The graph could not link a brand-new ExpressionSet's definition; do it now that it exists
+    if not resolved["ess"] and not write_esdcd(esdcd, esd_id, session, journal, esdcd_key):
+        return None, sync
+    return esdv_id, sync
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import sys
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Progress lines go to the current context's stream, or to sys.stdout (looked up at write time).
+# Library callers inject their own stream; each org of a multi-target import gets a labelled one.
+# Pool workers copy the caller's context, so their lines land in the same stream.
+_current_output = contextvars.ContextVar("output", default=None)
+_write_lock = threading.Lock()  # whole lines from concurrent orgs never interleave
+
+
+def output():
+    return _current_output.get() or sys.stdout
+
+
+def echo(*values, sep=" ", end="\n"):
+    print(*values, sep=sep, end=end, file=output())
+
+
+@contextmanager
+def output_to(stream):
+    # None keeps the surrounding stream
+    token = _current_output.set(stream or _current_output.get())
+    try:
+        yield
+    finally:
+        _current_output.reset(token)
+
+
+# === Prefixes every line with "[label] "; each thread's unfinished line is held back until complete ===
+class LabelledOutput:
+    def __init__(self, stream, label):
+        self.stream = stream
+        self.label = label
+        self._pending = {}  # thread id -> unfinished line
+
+    def write(self, text):
+        key = threading.get_ident()
+        *lines, rest = (self._pending.pop(key, "") + text).split("\n")
+        if rest:
+            self._pending[key] = rest
+        if lines:
+            with _write_lock:
+                self.stream.write("".join(f"[{self.label}] {line}\n" for line in lines))
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
@@ -0,0 +1,94 @@
+import json
+from collections import namedtuple, defaultdict
+from .uk_index import REFERENCE_PREFIXES, format_uk
+from .output import echo
+
+PREVIEW_LIMIT = 10  # examples printed per check; the JSON report holds all of them
+
+Issue = namedtuple("Issue", ["severity", "check", "csv_line", "detail"])
+
+
+# === Report ===
+class PreflightReport:
+    def __init__(self):
+        self.issues = []
+
+    def add(self, severity, check, csv_line, detail):
+        self.issues.append(Issue(severity, check, csv_line, detail))
+
+    @property
+    def errors(self):
+        return [i for i in self.issues if i.severity == "error"]
+
+    @property
+    def warnings(self):
+        return [i for i in self.issues if i.severity == "warning"]
+
+    def print_summary(self, limit=PREVIEW_LIMIT):
+        by_check = defaultdict(list)
+        for issue in self.issues:
+            by_check[(issue.severity, issue.check)].append(issue)
+        for (severity, check), issues in sorted(by_check.items()):
+            icon = "❌" if severity == "error" else "⚠️"
+            echo(f"{icon} {check}: {len(issues)}")
+            for issue in issues[:limit]:
+                where = f"CSV line {issue.csv_line}: " if issue.csv_line else ""
+                echo(f"    {where}{issue.detail}")
+            if len(issues) > limit:
+                echo(f"    … {len(issues) - limit} more")
+        echo(f"🧪 Pre-flight: {len(self.errors)} errors, {len(self.warnings)} warnings")
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"errors": len(self.errors), "warnings": len(self.warnings),
+                       "issues": [i._asdict() for i in self.issues]}, f, indent=2)
+
+
+# === One pass over the ESC rows, joined against hashed sets/maps built up front ===
+def run_preflight(esc_list, legacy_to_uk, target_maps, ambiguous=None, duplicates=None, model=None):
+    # target_maps / ambiguous / duplicates: object name -> {UK: target Id} / {UK} / {UK}
+    report = PreflightReport()
+    ambiguous = ambiguous or {}
+    duplicates = duplicates or {}
+    type_names = set(model.types) if model else None
+    port_names = {rel for t in model.types.values() for rel in t.relations} if model else None
+    tagged_types = set()
+    seen_tags = {}
+
+    for csv_line, row in enumerate(esc_list, start=2):  # line 1 is the header
+        ref_id = row.get("ReferenceObjectId", "")
+        obj_name = REFERENCE_PREFIXES.get(ref_id[:3])
+        uk = legacy_to_uk.get(ref_id)
+        if obj_name is None:
+            report.add("error", "Unsupported ReferenceObjectId", csv_line, ref_id)
+        elif uk is None:
+            report.add("error", f"{obj_name} missing from the export", csv_line, ref_id)
+        elif uk not in target_maps.get(obj_name, {}):
+            report.add("error", f"{obj_name} not found in the target org", csv_line, f"{ref_id} → UK: {format_uk(uk)}")
+        elif uk in ambiguous.get(obj_name, ()):
+            report.add("error", f"{obj_name} matches several target records", csv_line, f"{ref_id} → UK: {format_uk(uk)}")
+        elif uk in duplicates.get(obj_name, ()):
+            report.add("warning", f"Several exported {obj_name} records share one UK", csv_line, f"{ref_id} → UK: {format_uk(uk)}")
+
+        tag = row.get("ConstraintModelTag") or ""
+        tag_type = row.get("ConstraintModelTagType") or ""
+        if (tag, tag_type) in seen_tags:
+            report.add("warning", "Duplicate ConstraintModelTag", csv_line,
+                       f"{tag_type} {tag} (also on CSV line {seen_tags[(tag, tag_type)]})")
+        else:
+            seen_tags[(tag, tag_type)] = csv_line
+        if model is None:
+            continue
+        if tag_type == "Type":
+            tagged_types.add(tag)
+            if tag not in type_names:
+                report.add("warning", "Tag is not a type in the CML model", csv_line, tag)
+        elif tag_type == "Port" and tag not in port_names:
+            report.add("warning", "Tag is not a relation in the CML model", csv_line, tag)
+
+    if model is not None:
+        # Leaf types with no constraint object are never bound to a product or classification
+        for name in model.types:
+            if not model.subtypes(name) and name not in tagged_types:
+                report.add("warning", "CML type without a Type constraint object", None, name)
+    return report
@@ -0,0 +1,163 @@
+import os
+import re
+import time
+import random
+import threading
+import requests
+from .output import echo
+
+MAX_REQUESTS_PER_SECOND = float(os.environ.get("CML_MAX_RPS", "25"))  # token bucket refill rate per org
+INITIAL_CONCURRENCY = int(os.environ.get("CML_INITIAL_CONCURRENCY", "4"))
+MAX_CONCURRENCY = int(os.environ.get("CML_MAX_CONCURRENCY", "16"))
+MAX_RETRIES = int(os.environ.get("CML_MAX_RETRIES", "6"))
+BACKOFF_BASE = 0.5  # seconds; doubles per attempt
+BACKOFF_CAP = 30.0
+# Share of the org's daily API allowance left to other integrations: below twice this
+# headroom the request rate is scaled down, approaching a trickle at the reserve itself.
+API_RESERVE = float(os.environ.get("CML_API_RESERVE", "0.1"))
+MIN_REQUESTS_PER_SECOND = 0.5
+LATENCY_FACTOR = 2.0  # above this multiple of the best observed latency, concurrency stops growing
+
+RETRY_STATUSES = (429, 502, 503, 504)
+RETRY_ERROR_CODES = ("UNABLE_TO_LOCK_ROW", "REQUEST_LIMIT_EXCEEDED", "SERVER_UNAVAILABLE")
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "PATCH", "DELETE")
+# A gateway error can arrive after a POST was applied; only answers proving it was rejected are safe to replay
+REJECTED_STATUSES = (429,)
+REJECTED_ERROR_CODES = ("UNABLE_TO_LOCK_ROW", "REQUEST_LIMIT_EXCEEDED")
+
+API_USAGE_RE = re.compile(r"api-usage=(\d+)/(\d+)")
+
+
+# === Why a response should be retried (None when it should not) ===
+def retry_reason(resp, method="GET"):
+    idempotent = method.upper() in IDEMPOTENT_METHODS
+    if resp.status_code in (RETRY_STATUSES if idempotent else REJECTED_STATUSES):
+        return f"HTTP {resp.status_code}"
+    if resp.status_code in (400, 403, 409) and resp.headers.get("Content-Type", "").startswith("application/json"):
+        try:
+            body = resp.json()
+        except ValueError:
+            return None
+        for error in body if isinstance(body, list) else []:
+            code = isinstance(error, dict) and error.get("errorCode")
+            if code in (RETRY_ERROR_CODES if idempotent else REJECTED_ERROR_CODES):
+                return code
+    return None
+
+
+# Full jitter: a random wait up to the exponential step, or the server's Retry-After when it sent one
+def backoff_delay(attempt, retry_after=None, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    if retry_after:
+        try:
+            return min(cap, float(retry_after))
+        except ValueError:
+            pass
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+# === Per-org request scheduler: token bucket + AIMD concurrency + retry with backoff ===
+class RequestScheduler:
+    def __init__(self, rate=MAX_REQUESTS_PER_SECOND, initial_concurrency=INITIAL_CONCURRENCY,
+                 max_concurrency=MAX_CONCURRENCY, max_retries=MAX_RETRIES, reserve=API_RESERVE):
+        self.rate = rate
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = float(min(max(1, initial_concurrency), self.max_concurrency))
+        self.max_retries = max_retries
+        self.reserve = reserve
+        self.in_flight = 0
+        self.tokens = rate
+        self.refilled_at = time.monotonic()
+        self.best_latency = None
+        self.api_usage = None  # (used, max) from the last Sforce-Limit-Info header
+        self.retries = 0
+        self.throttled = 0
+        self._headroom_warned = False
+        self._cond = threading.Condition()
+
+    # --- admission ---
+    @property
+    def effective_rate(self):
+        if not self.api_usage or not self.reserve:
+            return self.rate
+        used, allowed = self.api_usage
+        headroom = 1 - used / allowed if allowed else 1
+        if headroom >= 2 * self.reserve:
+            return self.rate
+        return max(MIN_REQUESTS_PER_SECOND, self.rate * max(0.0, headroom - self.reserve) / self.reserve)
+
+    def _acquire(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                rate = self.effective_rate
+                self.tokens = min(max(rate, 1.0), self.tokens + (now - self.refilled_at) * rate)
+                self.refilled_at = now
+                if self.in_flight < int(self.limit) and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    return
+                wait = None if self.in_flight >= int(self.limit) else (1 - self.tokens) / rate
+                self._cond.wait(wait)
+
+    def _release(self, latency=None, congested=False):
+        with self._cond:
+            self.in_flight -= 1
+            if congested:
+                self.limit = max(1.0, self.limit / 2)  # multiplicative decrease
+                self.throttled += 1
+            elif latency is not None:
+                self.best_latency = latency if self.best_latency is None else min(self.best_latency, latency)
+                if latency <= LATENCY_FACTOR * self.best_latency:
+                    self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)  # ~+1 per round trip
+            self._cond.notify_all()
+
+    def _observe_limits(self, header):
+        match = API_USAGE_RE.search(header or "")
+        if not match:
+            return
+        used, allowed = int(match.group(1)), int(match.group(2))
+        with self._cond:
+            self.api_usage = (used, allowed)
+            low = allowed and 1 - used / allowed < 2 * self.reserve
+            warn = low and not self._headroom_warned
+            self._headroom_warned = self._headroom_warned or bool(low)
+        if warn:
+            echo(f"🐢 API usage {used}/{allowed}: slowing down to leave {self.reserve:.0%} for other integrations")
+
+    # --- send with retries ---
+    def call(self, method, send, on_retry=None):
+        for attempt in range(self.max_retries + 1):
+            self._acquire()
+            started = time.monotonic()
+            try:
+                resp = send()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._release(congested=True)
+                # A POST may have been applied before the connection dropped; never replay it
+                if method.upper() not in IDEMPOTENT_METHODS or attempt == self.max_retries:
+                    raise
+                reason, retry_after = type(e).__name__, None
+            except BaseException:
+                # Anything else (ChunkedEncodingError, a failed sf refresh on 401, ...) still frees the slot
+                self._release(congested=True)
+                raise
+            else:
+                self._observe_limits(resp.headers.get("Sforce-Limit-Info"))
+                reason = retry_reason(resp, method) if attempt < self.max_retries else None
+                self._release(time.monotonic() - started, congested=bool(reason))
+                if not reason:
+                    return resp
+                retry_after = resp.headers.get("Retry-After")
+                resp.close()
+            delay = backoff_delay(attempt, retry_after)
+            with self._cond:
+                self.retries += 1
+            if on_retry:
+                on_retry()
+            echo(f"⏳ {method} throttled ({reason}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+    def stats(self):
+        with self._cond:
+            return {"concurrency": round(self.limit, 1), "retries": self.retries, "throttled": self.throttled,
+                    "api_usage": self.api_usage}
@@ -0,0 +1,195 @@
+import re
+import sys
+import json
+import time
+import threading
+import inspect
+import contextvars
+import functools
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from .output import echo
+
+PROFILE_VERSION = 1
+# Record Ids, job Ids and query cursors (<Id>-<offset>) collapse into one endpoint
+ID_SEGMENT_RE = re.compile(r"^(?=.*\d)[A-Za-z0-9-]{15,}$")
+API_PREFIX_RE = re.compile(r"^/services/data/v\d+\.\d+")
+
+_current_phase = contextvars.ContextVar("profile_phase", default=())
+_current_profile = contextvars.ContextVar("run_profile", default=None)
+
+
+# Method + path with the API version and record Ids stripped, e.g. "PATCH /sobjects/ExpressionSetConstraintObj/{id}"
+def endpoint_of(method, url):
+    path = API_PREFIX_RE.sub("", urlsplit(url).path) or "/"
+    return f"{method.upper()} " + "/".join("{id}" if ID_SEGMENT_RE.match(seg) else seg for seg in path.split("/"))
+
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile of an ascending list
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class _CallStats:
+    __slots__ = ("calls", "errors", "retries", "bytes_out", "bytes_in", "latencies")
+
+    def __init__(self):
+        self.calls = self.errors = self.retries = self.bytes_out = self.bytes_in = 0
+        self.latencies = []
+
+    def add(self, seconds, status, bytes_out, bytes_in):
+        self.calls += 1
+        self.bytes_out += bytes_out
+        self.bytes_in += bytes_in
+        self.latencies.append(seconds)
+        if status is None or status >= 400:
+            self.errors += 1
+
+    def to_dict(self):
+        latencies = sorted(self.latencies)
+        ms = lambda s: None if s is None else round(s * 1000, 1)
+        return {"calls": self.calls, "errors": self.errors, "retries": self.retries,
+                "bytes_out": self.bytes_out, "bytes_in": self.bytes_in,
+                "p50_ms": ms(percentile(latencies, 50)), "p95_ms": ms(percentile(latencies, 95)),
+                "max_ms": ms(latencies[-1] if latencies else None)}
+
+
+# === Run profile: phases of the scripts and every HTTP attempt made inside them ===
+class RunProfile:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self._started = time.monotonic()
+            self._phases = {}  # "outer/inner" -> {"entries", "busy", "first", "last"}
+            self._phase_calls = {}  # phase -> _CallStats
+            self._endpoints = {}  # endpoint -> _CallStats
+            self._totals = _CallStats()
+
+    @contextmanager
+    def phase(self, name):
+        # Phases nest per context; pool workers that copy the caller's context report into its phase
+        path = _current_phase.get() + (name,)
+        token = _current_phase.set(path)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            ended = time.monotonic()
+            _current_phase.reset(token)
+            key = "/".join(path)
+            with self._lock:
+                p = self._phases.setdefault(key, {"entries": 0, "busy": 0.0, "first": started, "last": ended})
+                p["entries"] += 1
+                p["busy"] += ended - started
+                p["first"] = min(p["first"], started)
+                p["last"] = max(p["last"], ended)
+
+    def _stats_for(self, method, url):
+        phase = "/".join(_current_phase.get()) or "(no phase)"
+        endpoint = endpoint_of(method, url)
+        return (self._phase_calls.setdefault(phase, _CallStats()),
+                self._endpoints.setdefault(endpoint, _CallStats()), self._totals)
+
+    def record_call(self, method, url, seconds, resp=None, streamed=False):
+        # resp None means the request never got a response (connection error / timeout)
+        status = resp.status_code if resp is not None else None
+        bytes_out = bytes_in = 0
+        if resp is not None:
+            bytes_out = _content_length(resp.request.headers) if resp.request is not None else 0
+            # Streamed bodies are not read here; their size comes from Content-Length
+            bytes_in = _content_length(resp.headers) if streamed else len(resp.content or b"")
+        with self._lock:
+            for stats in self._stats_for(method, url):
+                stats.add(seconds, status, bytes_out, bytes_in)
+
+    def record_retry(self, method, url):
+        with self._lock:
+            for stats in self._stats_for(method, url):
+                stats.retries += 1
+
+    def to_dict(self, extra=None):
+        with self._lock:
+            phases = {}
+            for key, p in self._phases.items():
+                calls = self._phase_calls.get(key, _CallStats()).to_dict()
+                phases[key] = {"entries": p["entries"], "wall_seconds": round(p["last"] - p["first"], 3),
+                               "busy_seconds": round(p["busy"], 3), **calls}
+            for key, stats in self._phase_calls.items():
+                if key not in phases:
+                    phases[key] = stats.to_dict()
+            profile = {
+                "version": PROFILE_VERSION,
+                "command": " ".join(sys.argv),
+                "started": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started_at)),
+                "wall_seconds": round(time.monotonic() - self._started, 3),
+                "totals": self._totals.to_dict(),
+                "phases": phases,
+                "endpoints": {key: stats.to_dict() for key, stats in sorted(self._endpoints.items())},
+            }
+        profile.update(extra or {})
+        return profile
+
+    def write(self, path, extra=None):
+        profile = self.to_dict(extra)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(profile, f, indent=2)
+        totals = profile["totals"]
+        latency = f", p95 {totals['p95_ms']} ms" if totals["calls"] else ""
+        echo(f"📈 Run profile → {path} ({profile['wall_seconds']:.1f}s, {totals['calls']} API calls, "
+             f"{totals['retries']} retries{latency})")
+        return profile
+
+
+def _content_length(headers):
+    try:
+        return int(headers.get("Content-Length") or 0)
+    except ValueError:
+        return 0
+
+
+# The CLI scripts report into the process-wide profile; library callers get one profile per call
+PROFILE = RunProfile()
+
+
+def current_profile():
+    return _current_profile.get() or PROFILE
+
+
+@contextmanager
+def profiling(profile):
+    # Phases and HTTP calls made in this context (and pool workers copying it) go to `profile`
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+def phase(name):
+    return current_profile().phase(name)
+
+
+# Decorator: run the function as a phase; name may be a callable of the bound arguments
+def profiled(name):
+    def decorate(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if callable(name):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                label = name(bound.arguments)
+            else:
+                label = name
+            with phase(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,122 @@
+import csv
+import io
+import time
+from .sf_session import SalesforceApiError
+from .sf_collections import RecordResult
+from .output import echo
+
+BULK_POLL_INTERVAL = 2  # seconds
+BULK_FINAL_STATES = ("JobComplete", "Failed", "Aborted")
+BULK_RESULT_PAGE_SIZE = 100000  # rows per results request (maxRecords)
+
+
+# === Bulk API 2.0 ingest job helpers ===
+def _ingest_url(session, job_id=None, sub=None):
+    url = f"{session.base_url}/jobs/ingest"
+    if job_id:
+        url += f"/{job_id}"
+    if sub:
+        url += f"/{sub}"
+    return url
+
+
+def _check(resp, action, ok=(200, 201, 204)):
+    if resp.status_code not in ok:
+        raise SalesforceApiError(f"Bulk API {action} failed: {resp.status_code} - {resp.text}", resp.status_code, resp.text)
+    return resp
+
+
+def wait_for_job(session, job_url, poll_interval=BULK_POLL_INTERVAL):
+    while True:
+        info = _check(session.get(job_url), "job status").json()
+        if info.get("state") in BULK_FINAL_STATES:
+            return info
+        time.sleep(poll_interval)
+
+
+def run_ingest_job(session, obj_name, operation, csv_body, poll_interval=BULK_POLL_INTERVAL):
+    job = _check(session.post(_ingest_url(session), json={
+        "object": obj_name,
+        "operation": operation,
+        "contentType": "CSV",
+        "lineEnding": "LF"
+    }), f"{operation} job creation").json()
+    job_id = job["id"]
+    echo(f"🚚 Bulk API 2.0 {operation} job {job_id} for {obj_name}")
+
+    _check(session.request("PUT", _ingest_url(session, job_id, "batches"),
+                           data=csv_body.encode("utf-8"), headers={"Content-Type": "text/csv"}), "upload")
+    _check(session.patch(_ingest_url(session, job_id), json={"state": "UploadComplete"}), "close")
+    info = wait_for_job(session, _ingest_url(session, job_id), poll_interval)
+
+    failed = {}
+    failed_csv = _check(session.get(_ingest_url(session, job_id, "failedResults")), "failed results").text
+    for row in csv.DictReader(io.StringIO(failed_csv)):
+        failed[row.get("Id") or row.get("sf__Id")] = row.get("sf__Error", "")
+    return info, failed
+
+
+# === Bulk delete; hardDelete skips the recycle bin ===
+def bulk_delete(session, obj_name, ids, hard=True, poll_interval=BULK_POLL_INTERVAL):
+    csv_body = "Id\n" + "\n".join(ids) + "\n"
+    operation = "hardDelete" if hard else "delete"
+    try:
+        info, failed = run_ingest_job(session, obj_name, operation, csv_body, poll_interval)
+    except SalesforceApiError as e:
+        if not hard or e.status_code not in (400, 403):
+            raise
+        # hardDelete needs the "Bulk API Hard Delete" permission; fall back to a soft delete
+        echo(f"⚠️ hardDelete not permitted ({e.status_code}), falling back to Bulk API delete")
+        info, failed = run_ingest_job(session, obj_name, "delete", csv_body, poll_interval)
+
+    if info.get("state") != "JobComplete":
+        errors = [{"statusCode": info.get("state"), "message": info.get("errorMessage", "")}]
+        return [RecordResult(i, rid, False, errors) for i, rid in enumerate(ids)]
+    return [
+        RecordResult(i, rid, rid not in failed, [{"statusCode": "BULK_ERROR", "message": failed[rid]}] if rid in failed else [])
+        for i, rid in enumerate(ids)
+    ]
+
+
+# === Bulk API 2.0 query job: results stream straight to disk, no JSON/CSV round trip ===
+def run_query_job(session, soql, poll_interval=BULK_POLL_INTERVAL):
+    job = _check(session.post(f"{session.base_url}/jobs/query", json={
+        "operation": "query",
+        "query": " ".join(soql.split()),
+        "contentType": "CSV",
+        "lineEnding": "LF"
+    }), "query job creation").json()
+    echo(f"🚚 Bulk API 2.0 query job {job['id']}")
+    info = wait_for_job(session, f"{session.base_url}/jobs/query/{job['id']}", poll_interval)
+    if info.get("state") != "JobComplete":
+        raise SalesforceApiError(f"Bulk query job {job['id']} ended as {info.get('state')}: {info.get('errorMessage', '')}",
+                                 None, info)
+    return job["id"]
+
+
+def stream_query_results(session, job_id, out_file, expected_columns, page_size=BULK_RESULT_PAGE_SIZE):
+    # Every results page starts with its own header line; drop it and copy the rest byte for byte.
+    url = f"{session.base_url}/jobs/query/{job_id}/results"
+    locator = None
+    count = 0
+    while True:
+        params = {"maxRecords": page_size}
+        if locator:
+            params["locator"] = locator
+        resp = _check(session.get(url, params=params, stream=True), "query results", ok=(200,))
+        header = b""
+        for chunk in resp.iter_content(chunk_size=1024 * 1024):
+            if header is not None:
+                header += chunk
+                if b"\n" not in header:
+                    continue
+                line, chunk = header.split(b"\n", 1)
+                columns = next(csv.reader([line.decode("utf-8")]))
+                if len(columns) != expected_columns:
+                    raise SalesforceApiError(f"Bulk result has {len(columns)} columns, expected {expected_columns}: {columns}")
+                header = None
+            out_file.write(chunk)
+        count += int(resp.headers.get("Sforce-NumberOfRecords", 0))
+        locator = resp.headers.get("Sforce-Locator")
+        if not locator or locator == "null":
+            return count
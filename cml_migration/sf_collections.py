@@ -0,0 +1,115 @@
+import time
+import contextvars
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from .rate_limit import RETRY_ERROR_CODES, MAX_RETRIES, backoff_delay
+
+COLLECTION_BATCH_SIZE = 200  # sObject Collections hard limit per request
+DEFAULT_CONCURRENCY = 4
+
+# One result per input record, in input order
+RecordResult = namedtuple("RecordResult", ["index", "id", "success", "errors"])
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield start, items[start:start + size]
+
+
+def format_errors(errors):
+    return "; ".join(f"{e.get('statusCode') or e.get('errorCode')}: {e.get('message')}" for e in errors or [])
+
+
+# === Run one callable per batch on a bounded pool, results back in input order ===
+# on_batch(results) is called from the worker as soon as a batch returns, e.g. to journal progress.
+def _run_batches(items, batch_size, max_workers, send_batch, on_batch=None):
+    batches = list(chunked(items, batch_size))
+    results = [None] * len(items)
+
+    def run(start, batch):
+        batch_results = _retry_locked(start, batch, send_batch, send_batch(start, batch))
+        if on_batch:
+            on_batch(batch_results)
+        return batch_results
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches) or 1))) as pool:
+        # Workers run in a copy of the caller's context, so per-import context (e.g. an output label) follows them
+        futures = [(start, pool.submit(contextvars.copy_context().run, run, start, batch)) for start, batch in batches]
+        for start, future in futures:
+            for offset, result in enumerate(future.result()):
+                results[start + offset] = result
+    return results
+
+
+# Resend only the records that failed on row locks (allOrNone=false, so the rest already landed)
+def _retry_locked(start, batch, send_batch, results, max_retries=MAX_RETRIES):
+    for attempt in range(max_retries):
+        pending = [i for i, r in enumerate(results)
+                   if not r.success and any((e.get("statusCode") or e.get("errorCode")) in RETRY_ERROR_CODES for e in r.errors)]
+        if not pending:
+            break
+        time.sleep(backoff_delay(attempt))
+        for i, result in zip(pending, send_batch(start, [batch[i] for i in pending])):
+            results[i] = result._replace(index=start + i)
+    return results
+
+
+def _batch_failure(start, batch, resp):
+    errors = [{"statusCode": f"HTTP_{resp.status_code}", "message": resp.text}]
+    return [RecordResult(start + i, None, False, errors) for i in range(len(batch))]
+
+
+def _collection_results(start, batch, resp, ids=None):
+    if resp.status_code != 200:
+        return _batch_failure(start, batch, resp)
+    return [
+        RecordResult(start + i, r.get("id") or (ids[i] if ids else None), bool(r.get("success")), r.get("errors") or [])
+        for i, r in enumerate(resp.json())
+    ]
+
+
+# === sObject Collections: create ===
+def create_records(session, obj_name, records, batch_size=COLLECTION_BATCH_SIZE, max_workers=DEFAULT_CONCURRENCY,
+                   on_batch=None):
+    url = f"{session.base_url}/composite/sobjects"
+
+    def send_batch(start, batch):
+        body = {
+            "allOrNone": False,
+            "records": [
+                {"attributes": {"type": obj_name}, **{k: v for k, v in rec.items() if k != "Id"}}
+                for rec in batch
+            ]
+        }
+        resp = session.post(url, json=body)
+        return _collection_results(start, batch, resp)
+
+    return _run_batches(records, batch_size, max_workers, send_batch, on_batch)
+
+
+# === sObject Collections: update (records must carry Id) ===
+def update_records(session, obj_name, records, batch_size=COLLECTION_BATCH_SIZE, max_workers=DEFAULT_CONCURRENCY,
+                   on_batch=None):
+    url = f"{session.base_url}/composite/sobjects"
+
+    def send_batch(start, batch):
+        body = {
+            "allOrNone": False,
+            "records": [{"attributes": {"type": obj_name}, **rec} for rec in batch]
+        }
+        resp = session.patch(url, json=body)
+        return _collection_results(start, batch, resp, ids=[rec["Id"] for rec in batch])
+
+    return _run_batches(records, batch_size, max_workers, send_batch, on_batch)
+
+
+# === sObject Collections: delete ===
+def delete_records(session, ids, batch_size=COLLECTION_BATCH_SIZE, max_workers=DEFAULT_CONCURRENCY,
+                   on_batch=None):
+    url = f"{session.base_url}/composite/sobjects"
+
+    def send_batch(start, batch):
+        resp = session.delete(url, params={"ids": ",".join(batch), "allOrNone": "false"})
+        return _collection_results(start, batch, resp, ids=batch)
+
+    return _run_batches(ids, batch_size, max_workers, send_batch, on_batch)
@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import threading
+import contextvars
+import subprocess
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from .rate_limit import RequestScheduler, MAX_CONCURRENCY
+from .run_profile import current_profile
+from .output import echo
+
+SESSION_CACHE_DIR = os.environ.get(
+    "CML_SESSION_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cml_migration", "sessions")
+)
+SESSION_CACHE_TTL = int(os.environ.get("CML_SESSION_CACHE_TTL", "3600"))  # seconds
+HTTP_POOL_SIZE = max(16, MAX_CONCURRENCY)  # keep-alive connections; never fewer than the scheduler admits
+
+class SalesforceApiError(Exception):
+    def __init__(self, message, status_code=None, body=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+
+# === API Version resolver helper ===
+def get_latest_api_version(instance_url, http=None):
+    resp = (http or requests).get(f"{instance_url}/services/data/")
+    if resp.status_code == 200:
+        versions = resp.json()
+        return versions[-1]["version"]  # The last one is the latest
+    else:
+        raise Exception(f"Failed to retrieve API versions: {resp.status_code} - {resp.text}")
+
+# === Salesforce CLI org info ===
+def get_org_info(alias):
+    result = subprocess.run(
+        ["sf", "org", "display", "--target-org", alias, "--json"],
+        check=True,
+        capture_output=True,
+        text=True
+    )
+    info = json.loads(result.stdout)["result"]
+    return info["accessToken"], info["instanceUrl"]
+
+
+# === Shared org session ===
+# Resolves auth + API version once per alias (cached on disk between runs) and
+# keeps a pooled keep-alive requests.Session for every REST call against the org.
+class OrgSession:
+    def __init__(self, alias, cache_dir=SESSION_CACHE_DIR, cache_ttl=SESSION_CACHE_TTL):
+        self.alias = alias
+        self.cache_path = os.path.join(cache_dir, f"{alias}.json") if cache_dir else None
+        self.cache_ttl = cache_ttl
+        self.access_token = None
+        self.instance_url = None
+        self.api_version = None
+        self._lock = threading.Lock()
+
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        self.http.mount("https://", adapter)
+        self.http.mount("http://", adapter)
+        # Every call to the org shares one rate/concurrency budget and retries throttled responses
+        self.scheduler = RequestScheduler()  # concurrency ceiling from CML_MAX_CONCURRENCY
+
+        if not self._load_cache():
+            self.refresh()
+
+    # --- on-disk token/instance/version cache ---
+    def _load_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if time.time() - cached.get("fetched_at", 0) > self.cache_ttl:
+            return False
+        self.access_token = cached["access_token"]
+        self.instance_url = cached["instance_url"]
+        self.api_version = cached["api_version"]
+        self._apply_auth_header()
+        echo(f"🔑 Using cached session for {self.alias} - instance: {self.instance_url}")
+        return True
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = self.cache_path + ".tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)  # token inside: owner-only
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({
+                "access_token": self.access_token,
+                "instance_url": self.instance_url,
+                "api_version": self.api_version,
+                "fetched_at": time.time()
+            }, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def _apply_auth_header(self):
+        self.http.headers["Authorization"] = f"Bearer {self.access_token}"
+
+    def refresh(self, stale_token=None):
+        with self._lock:
+            if stale_token and stale_token != self.access_token:
+                return  # another thread already refreshed
+            self.access_token, instance_url = get_org_info(self.alias)
+            if instance_url != self.instance_url or not self.api_version:
+                self.instance_url = instance_url
+                self.api_version = get_latest_api_version(instance_url, self.http)
+            self._apply_auth_header()
+            self._save_cache()
+        echo(f"🔑 Auth success for {self.alias} - instance: {self.instance_url} (API v{self.api_version})")
+
+    # --- URL helpers ---
+    @property
+    def base_url(self):
+        return f"{self.instance_url}/services/data/v{self.api_version}"
+
+    @property
+    def query_url(self):
+        return f"{self.base_url}/query"
+
+    def sobject_url(self, obj_name, record_id=None):
+        url = f"{self.base_url}/sobjects/{obj_name}/"
+        return url + record_id if record_id else url
+
+    # --- HTTP ---
+    def request(self, method, url, **kwargs):
+        if url.startswith("/"):
+            url = self.instance_url + url
+        return self.scheduler.call(method, lambda: self._send(method, url, **kwargs),
+                                   on_retry=lambda: current_profile().record_retry(method, url))
+
+    def _send(self, method, url, **kwargs):
+        token_used = self.access_token
+        resp = self._timed(method, url, **kwargs)
+        if resp.status_code == 401:
+            # Cached token expired or was revoked: re-resolve once and retry
+            echo(f"🔄 Session expired for {self.alias}, refreshing...")
+            self.refresh(stale_token=token_used)
+            resp = self._timed(method, url, **kwargs)
+        return resp
+
+    # Every attempt is accounted to the run profile's current phase and endpoint
+    def _timed(self, method, url, **kwargs):
+        started = time.monotonic()
+        try:
+            resp = self.http.request(method, url, **kwargs)
+        except Exception:
+            current_profile().record_call(method, url, time.monotonic() - started)
+            raise
+        current_profile().record_call(method, url, time.monotonic() - started, resp, streamed=kwargs.get("stream", False))
+        return resp
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    # --- SOQL ---
+    def _query_page(self, url, params=None):
+        resp = self.get(url, params=params)
+        if resp.status_code != 200:
+            raise SalesforceApiError(f"Query failed: {resp.status_code} - {resp.text}", resp.status_code, resp.text)
+        return resp.json()
+
+    def iter_query_pages(self, soql, prefetch=False, include_deleted=False):
+        # Follows nextRecordsUrl until done; with prefetch the next page is fetched
+        # in the background while the caller is still consuming the current one.
+        url = f"{self.base_url}/{'queryAll' if include_deleted else 'query'}"
+        page = self._query_page(url, {"q": soql})
+        if not prefetch:
+            while True:
+                yield page.get("records", [])
+                next_url = page.get("nextRecordsUrl")
+                if not next_url:
+                    return
+                page = self._query_page(next_url)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            while True:
+                next_url = page.get("nextRecordsUrl")
+                pending = pool.submit(contextvars.copy_context().run, self._query_page, next_url) if next_url else None
+                yield page.get("records", [])
+                if pending is None:
+                    return
+                page = pending.result()
+
+    def iter_query(self, soql, prefetch=False, include_deleted=False):
+        for records in self.iter_query_pages(soql, prefetch, include_deleted):
+            yield from records
+
+    def query(self, soql, include_deleted=False):
+        return list(self.iter_query(soql, include_deleted=include_deleted))
+
+
+# === One session per alias per pool ===
+# The CLI scripts share the process-wide default pool; a library client brings its own,
+# so a long-running process keeps auth, API version and keep-alive connections warm between runs.
+class SessionPool:
+    def __init__(self, cache_dir=SESSION_CACHE_DIR, cache_ttl=SESSION_CACHE_TTL):
+        self.cache_dir = cache_dir
+        self.cache_ttl = cache_ttl
+        self._sessions = {}
+        self._alias_locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, alias):
+        with self._lock:
+            session = self._sessions.get(alias)
+            if session is not None:
+                return session
+            alias_lock = self._alias_locks.setdefault(alias, threading.Lock())
+        # Auth (sf CLI, API version lookup) runs under the alias's own lock only,
+        # so several orgs authenticate concurrently while each one is resolved once
+        with alias_lock:
+            with self._lock:
+                session = self._sessions.get(alias)
+            if session is None:
+                session = OrgSession(alias, self.cache_dir, self.cache_ttl)
+                with self._lock:
+                    self._sessions[alias] = session
+            return session
+
+    def stats(self):
+        with self._lock:
+            sessions = dict(self._sessions)
+        return {alias: session.scheduler.stats() for alias, session in sessions.items()}
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.http.close()
+
+
+_default_pool = SessionPool()
+_current_pool = contextvars.ContextVar("session_pool", default=_default_pool)
+
+
+@contextmanager
+def using_sessions(pool):
+    # get_org_session() in this context (and pool workers copying it) resolves aliases through `pool`
+    token = _current_pool.set(pool)
+    try:
+        yield pool
+    finally:
+        _current_pool.reset(token)
+
+
+def get_org_session(alias):
+    return _current_pool.get().get(alias)
+
+
+# Request scheduler counters of every org used through the current pool, for the run profile
+def scheduler_stats():
+    return _current_pool.get().stats()
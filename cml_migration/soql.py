@@ -0,0 +1,54 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Query strings travel as a GET parameter; keep each IN list well below the
+# ~16k URI limit once percent-encoded (SOQL itself allows 100k characters).
+MAX_IN_CLAUSE_CHARS = 4000
+DEFAULT_CHUNK_CONCURRENCY = 4
+
+
+# === Literal quoting ===
+def quote(value):
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+# === Datetime literal from an API timestamp (2024-05-01T10:20:30.000+0000 -> 2024-05-01T10:20:30Z) ===
+def datetime_literal(stamp):
+    return stamp[:19] + "Z"
+
+
+# === Split values into IN lists bounded by character length ===
+def in_clause_chunks(values, max_chars=MAX_IN_CLAUSE_CHARS):
+    chunk, length = [], 0
+    for value in sorted(set(values)):
+        literal = quote(value)
+        if chunk and length + len(literal) + 1 > max_chars:
+            yield ",".join(chunk)
+            chunk, length = [], 0
+        chunk.append(literal)
+        length += len(literal) + 1
+    if chunk:
+        yield ",".join(chunk)
+
+
+# template holds one "{values}" placeholder, e.g. "SELECT Id FROM Product2 WHERE Id IN ({values})"
+def build_in_queries(template, values, max_chars=MAX_IN_CLAUSE_CHARS):
+    return [template.replace("{values}", chunk) for chunk in in_clause_chunks(values, max_chars)]
+
+
+# === Run several queries in parallel and merge them into one record stream ===
+def iter_queries(session, queries, max_workers=DEFAULT_CHUNK_CONCURRENCY, prefetch=False):
+    if isinstance(queries, str):
+        queries = [queries]
+    if len(queries) <= 1:
+        for soql in queries:
+            yield from session.iter_query(soql, prefetch=prefetch)
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(queries)))) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, session.query, soql) for soql in queries]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def chunked_query(session, template, values, max_workers=DEFAULT_CHUNK_CONCURRENCY):
+    return iter_queries(session, build_in_queries(template, values), max_workers)
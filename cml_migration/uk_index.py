@@ -0,0 +1,76 @@
+from collections import defaultdict
+
+# Legacy Id key prefix -> object the ESC ReferenceObjectId points at
+REFERENCE_PREFIXES = {"01t": "Product2", "11B": "ProductClassification", "0dS": "ProductRelatedComponent"}
+# Columns of the exported supporting objects the unique keys are built from
+UK_COLUMNS = {
+    "Product2": ("Id", "Name"),
+    "ProductClassification": ("Id", "Name"),
+    "ProductRelatedComponent": ("Id", "ParentProduct.Name", "ChildProduct.Name", "ChildProductClassification.Name",
+                                "ProductRelationshipType.Name", "Sequence"),
+}
+
+
+# === Unique keys the import joins on ===
+# Product2 and ProductClassification are keyed by Name. A PRC is keyed by the tuple
+# (parent, child, classification, relationship type, sequence): tuples hash without building
+# a string per row, and a name containing the old "|" separator can no longer collide.
+def prc_source_uk(row):
+    # Exported CSV row, flattened relationship columns
+    return (
+        row["ParentProduct.Name"],
+        row.get("ChildProduct.Name") or "",
+        row.get("ChildProductClassification.Name") or "",
+        row.get("ProductRelationshipType.Name") or "",
+        row.get("Sequence") or "",
+    )
+
+
+def prc_target_uk(r):
+    # REST query record, nested relationship objects
+    if not r.get("ParentProduct"):
+        return None
+    return (
+        r["ParentProduct"]["Name"],
+        r["ChildProduct"]["Name"] if r.get("ChildProduct") else "",
+        r["ChildProductClassification"]["Name"] if r.get("ChildProductClassification") else "",
+        r["ProductRelationshipType"]["Name"] if r.get("ProductRelationshipType") else "",
+        str(r["Sequence"]) if r.get("Sequence") is not None else "",
+    )
+
+
+def format_uk(uk):
+    return " | ".join(uk) if isinstance(uk, tuple) else str(uk)
+
+
+# === One streaming pass over the ESC rows: referenced legacy Ids partitioned by key prefix ===
+# Used by the export to pick the supporting records to pull; ids with other prefixes are left to pre-flight.
+def reference_ids_by_prefix(esc_rows):
+    partitions = {prefix: set() for prefix in REFERENCE_PREFIXES}
+    for row in esc_rows:
+        ref_id = row.get("ReferenceObjectId") or ""
+        bucket = partitions.get(ref_id[:3])
+        if bucket is not None:
+            bucket.add(ref_id)
+    return {prefix: sorted(ids) for prefix, ids in partitions.items()}
+
+
+# Legacy Id -> UK for the exported Product2 / ProductClassification / PRC rows (one pass per table),
+# plus the UKs that several source records share (they collapse onto one target record).
+def legacy_uk_maps(product_rows, classification_rows, prc_rows):
+    legacy_to_uk = {}
+    uks = {"Product2": set(), "ProductClassification": set(), "ProductRelatedComponent": set()}
+    duplicates = defaultdict(set)
+    for obj_name, rows, key_fn in (
+        ("Product2", product_rows, lambda r: r["Name"]),
+        ("ProductClassification", classification_rows, lambda r: r["Name"]),
+        ("ProductRelatedComponent", prc_rows, prc_source_uk),
+    ):
+        seen = uks[obj_name]
+        for row in rows:
+            uk = key_fn(row)
+            if uk in seen:
+                duplicates[obj_name].add(uk)
+            seen.add(uk)
+            legacy_to_uk[row["Id"]] = uk
+    return legacy_to_uk, uks, duplicates